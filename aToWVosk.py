@@ -1,232 +1,425 @@
 import os
+import io
 from pathlib import Path
 import shutil
-from pydub import AudioSegment
+from multiprocessing import Pool
 import json
-from vosk import Model, KaldiRecognizer
-import wave
 import re
-import pandas as pd
+import argparse
+from mp3Frames import Mp3Frames
+from clipExport import ClipExporter
+from voskIngest import recognizer_pcm, recognize_pcm, sentence_grammar
+from wordAlign import normalize_word, align_words
+from wordSink import WordSink, write_word_excel
+
+def merge_split_boundaries(original_words, boundaries):
+    """Join boundaries the engine reported in pieces (e.g. "well", "known" for "well-known").
+
+    Consecutive boundaries are only merged when together they spell one of the
+    original words; anything else is left as it was reported.
+    """
+    targets = {normalize_word(w): w for w in original_words if normalize_word(w)}
+    merged = []
+    pos = 0
+    while pos < len(boundaries):
+        first = boundaries[pos]
+        end = pos + 1
+        word = first['word']
+        heard = normalize_word(word)
+        if heard not in targets:
+            for k in range(pos + 1, len(boundaries)):
+                heard += normalize_word(boundaries[k]['word'])
+                if heard in targets:
+                    end = k + 1
+                    word = targets[heard]
+                    break
+                if not any(target.startswith(heard) for target in targets):
+                    break
+        merged.append({'word': word, 'start': first['start'], 'end': boundaries[end - 1]['end']})
+        pos = end
+    return merged
+
+
+def match_boundaries(original_words, boundaries, duration=None):
+    """Pair each original word with its TTS word-boundary timing.
+
+    Pieces of one word are merged first; the result is aligned by edit distance
+    exactly like recognized words (wordAlign.align_words), so a dropped or
+    differently spelt word can't shift the timings of the words after it.
+    Returns (matched, extras, substitutions) as align_words does.
+    """
+    return align_words(original_words, merge_split_boundaries(original_words, boundaries), duration)
+
+
+def check_model_path(model_path):
+    """Raise if model_path isn't a complete Vosk model folder; returns it as a Path"""
+    # More detailed model path checking
+    model_path = Path(model_path)
+    if not model_path.exists():
+        raise Exception(f"Model path does not exist: {model_path}")
+
+    # Check for essential model files
+    required_files = ['am/final.mdl', 'conf/mfcc.conf']
+    missing_files = []
+    for file in required_files:
+        if not (model_path / file).exists():
+            missing_files.append(file)
+
+    if missing_files:
+        raise Exception(f"Missing model files: {missing_files}. Please ensure you downloaded and extracted the complete model.")
+    return model_path
+
+
+# Processes process_audio_folder splits files in; each loads its own Vosk model.
+# 1 keeps the original one-file-at-a-time loop.
+WORKERS = max(1, (os.cpu_count() or 2) - 1)
+# Recognize each file against its own sentence's words instead of the full vocabulary
+USE_GRAMMAR = True
+# Time words from the audio's silences when Vosk hears nothing (or no model is loaded);
+# the files are still listed in text_mismatches.json
+ENERGY_FALLBACK = True
+
 
 class AudioSplitter:
-    def __init__(self, output_dir="audio_output", model_path="model"):
+    def __init__(self, output_dir="audio_output", model_path="model", frame_cut=False, use_grammar=False,
+                 alignment="sequence", sink=None, energy_fallback=False):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         self.current_word_number = 1  # Add counter for word numbering
+        # Cut word clips on mp3 frame boundaries instead of decoding and re-encoding them
+        self.frame_cut = frame_cut
+        # Limit recognition to each sentence's own words (plus [unk]) unless split_audio_file says otherwise
+        self.use_grammar = use_grammar
+        # How recognized words are paired with the text: "sequence" (edit distance) or "position" (by index)
+        self.alignment = alignment
+        # Fall back to silence-based word timings (silenceSplit) when recognition finds no words
+        self.energy_fallback = energy_fallback
         self.mismatches = []
         self.word_data = [] 
+        # Optional wordSink.WordSink; records then go to disk as they're made instead of the lists above
+        self.sink = sink
+        # Decoded clips are queued here and encoded together at the end of each file
+        self.exporter = ClipExporter()
         
-        # More detailed model path checking
-        model_path = Path(model_path)
-        if not model_path.exists():
-            raise Exception(f"Model path does not exist: {model_path}")
-        
-        # Check for essential model files
-        required_files = ['am/final.mdl', 'conf/mfcc.conf']
-        missing_files = []
-        for file in required_files:
-            if not (model_path / file).exists():
-                missing_files.append(file)
-        
-        if missing_files:
-            raise Exception(f"Missing model files: {missing_files}. Please ensure you downloaded and extracted the complete model.")
-        
+        # Without a model only split_from_boundaries is available
+        if model_path is None:
+            self.model = None
+            return
+
+        model_path = check_model_path(model_path)
         print(f"Loading model from: {model_path.absolute()}")
         try:
+            from vosk import Model
             self.model = Model(str(model_path.absolute()))
             print("Model loaded successfully")
         except Exception as e:
             raise Exception(f"Failed to load model: {str(e)}")
 
-    def convert_to_wav(self, audio_path):
-        """Convert audio to WAV format with required parameters"""
-        audio = AudioSegment.from_file(audio_path)
-        wav_path = str(self.output_dir / "temp.wav")
-        audio.export(wav_path, format="wav", parameters=["-ar", "16000", "-ac", "1"])
-        return wav_path
-
-    def get_word_timestamps(self, wav_path):
-        """Get word timestamps using Vosk"""
-        wf = wave.open(wav_path, "rb")
-        rec = KaldiRecognizer(self.model, wf.getframerate())
-        rec.SetWords(True)
-
-        words_with_times = []
-        while True:
-            # data = wf.readframes(4000)
-            data = wf.readframes(512)
-            if len(data) == 0:
-                break
-            if rec.AcceptWaveform(data):
-                result = json.loads(rec.Result())
-                if 'result' in result:
-                    words_with_times.extend(result['result'])
-
-        # Get final result
-        result = json.loads(rec.FinalResult())
-        if 'result' in result:
-            words_with_times.extend(result['result'])
-
-        return words_with_times
-
-    def split_audio_file(self, audio_path, original_text, ordinal_number):
+    def load_audio(self, audio_path, audio_bytes=None):
+        """Decode audio from memory when the bytes are at hand, otherwise from disk"""
+        # Decoding-related modules are imported on use, so `cli.py align --dry-run` starts quickly
+        from pydub import AudioSegment
+        if audio_bytes is not None:
+            return AudioSegment.from_file(io.BytesIO(audio_bytes), format="mp3")
+        return AudioSegment.from_file(audio_path)
+
+    def load_clip_source(self, audio_path, audio_bytes=None, decoded=None):
+        """Audio that word clips are cut from: mp3 frames in frame_cut mode, decoded PCM otherwise.
+
+        decoded is audio split_audio_file already has in memory; it is reused rather
+        than decoding the file again. Decoded audio is wrapped in a PcmBuffer so
+        cutting and padding words doesn't copy it around.
+        """
+        if not self.frame_cut:
+            from pcmBuffer import PcmBuffer, pads_like_pydub
+            if decoded is None:
+                decoded = self.load_audio(audio_path, audio_bytes)
+            return PcmBuffer.from_segment(decoded) if pads_like_pydub(decoded) else decoded
+        if audio_bytes is not None:
+            return Mp3Frames(audio_bytes)
+        return Mp3Frames.from_file(audio_path)
+
+    def pcm_for_recognizer(self, audio):
+        """Resample decoded audio to the recognizer's 16 kHz mono PCM, in memory"""
+        return recognizer_pcm(audio)
+
+    def get_word_timestamps(self, pcm, grammar=None):
+        """Get word timestamps using Vosk, optionally limited to a grammar (voskIngest.sentence_grammar)"""
+        return recognize_pcm(self.model, pcm, grammar=grammar)
+
+    def energy_word_timestamps(self, audio, original_words):
+        """Word timings from the non-silent stretches of the decoded audio, no recognizer involved"""
+        from silenceSplit import energy_word_timestamps
+        return energy_word_timestamps(audio, [w for w in original_words if normalize_word(w)])
+
+    def split_audio_file(self, audio_path, original_text, ordinal_number, audio_bytes=None, use_grammar=None):
+        """Split one sentence file into word clips.
+
+        audio_bytes can carry the mp3 straight from synthesis (main.AudioSplitter with
+        keep_audio=True); audio_path is then only used for naming. use_grammar
+        overrides the splitter's setting for this file.
+        """
         try:
             print(f"Processing audio: {audio_path}")
             
             # Get original words and their positions
             original_words = original_text.lower().strip().split()
-            original_word_count = len(original_words)
             
-            # Convert and get timestamps
-            wav_path = self.convert_to_wav(audio_path)
-            words_with_times = self.get_word_timestamps(wav_path)
-            detected_word_count = len(words_with_times)
+            # Decode once; the same audio feeds the recognizer and the word clips
+            decoded = self.load_audio(audio_path, audio_bytes)
+            if use_grammar is None:
+                use_grammar = self.use_grammar
+            grammar = sentence_grammar(original_text) if use_grammar else None
+            if self.model is None and self.energy_fallback:
+                words_with_times = []
+            else:
+                words_with_times = self.get_word_timestamps(self.pcm_for_recognizer(decoded), grammar)
+            energy_timed = not words_with_times and self.energy_fallback
+            if energy_timed:
+                print("No words recognized; timing words from the silences between them")
+                words_with_times = self.energy_word_timestamps(decoded, original_words)
             
-            # Only analyze detected text if word counts don't match
-            if detected_word_count != original_word_count:
-                detected_text = ' '.join(w['word'] for w in words_with_times)
-                filename = Path(audio_path).name
-                self.mismatches.append({
-                    'filename': filename,
-                    'original_text': original_text,
-                    'detected_text': detected_text,
-                    'original_word_count': original_word_count,
-                    'detected_word_count': detected_word_count,
-                    'detected_words': [w['word'] for w in words_with_times]
-                })
-                print(f"Warning: Word count mismatch!")
-                print(f"Original words ({original_word_count}): {original_words}")
-                print(f"Detected words ({detected_word_count}): {[w['word'] for w in words_with_times]}")
+            if energy_timed:
+                # Nothing was recognized, so the clips can't be trusted to match the text
+                matched, extras, _ = align_words(original_words, words_with_times, duration=len(decoded) / 1000)
+                word_count_match = False
+                self.record_mismatch(audio_path, original_text, original_words, words_with_times,
+                                     note="no words recognized; timings estimated from silences")
+            elif self.alignment == "position":
+                # Only analyze detected text if word counts don't match
+                if len(words_with_times) != len(original_words):
+                    self.record_mismatch(audio_path, original_text, original_words, words_with_times)
+
+                # Detected words are matched to the original words by position
+                matched = [words_with_times[i] if i < len(words_with_times) else None for i in range(len(original_words))]
+                extras = words_with_times[len(original_words):]
+                word_count_match = len(words_with_times) == len(original_words)
+            else:
+                # Edit-distance alignment: dropped words get interpolated timings. Words heard
+                # differently, not heard at all or heard in addition make the file a mismatch
+                matched, extras, substitutions = align_words(original_words, words_with_times,
+                                                             duration=len(decoded) / 1000)
+                unheard = [m['word'] for m in matched if m is not None and m.get('interpolated')]
+                word_count_match = not (substitutions or unheard or extras)
+                if not word_count_match:
+                    self.record_mismatch(audio_path, original_text, original_words, words_with_times,
+                                         substitutions, unheard=unheard, extras=extras)
+
+            audio = self.load_clip_source(audio_path, audio_bytes, decoded)
+            result = self.write_word_clips(audio, original_words, ordinal_number, matched, extras)
+            result['word_count_match'] = word_count_match
+            result['text'] = ' '.join(w['word'] for w in words_with_times)
         
-            # Load the original audio
-            audio = AudioSegment.from_file(audio_path)
-            word_files = []
+            return result
         
-            # Create a list to store all words (detected and missing)
-            all_words_data = []
-            
-            # First, process the original words
-            for i, original_word in enumerate(original_words):
-                filename = f"ENGA1X{self.current_word_number:06d}-0200"
-                
-                word_data = {
-                    'word': original_word,
-                    'fileName': filename,
-                    'ordinalNumber': ordinal_number,
-                    'wordIndex': i,
-                    'originalWord': original_word,
-                    'detected': False,
-                    'isExtra': False
-                }
-            
-                # Only create audio file if word was detected
-                if i < len(words_with_times):
-                    vosk_data = words_with_times[i]
-                    start_time = int(vosk_data['start'] * 1000)
-                    end_time = int(vosk_data['end'] * 1000)
-                
-                    word_audio = audio[start_time:end_time]
-                    silence = AudioSegment.silent(duration=100)
-                    word_audio = silence + word_audio + silence
-                
-                    full_filename = self.output_dir / f"{filename}.mp3"
-                    word_audio.export(str(full_filename), format="mp3")
-                    word_files.append(full_filename)
-                
-                    word_data['detected'] = True
-            
-                all_words_data.append(word_data)
-                self.current_word_number += 1
+        except Exception as e:
+            print(f"Error processing audio file: {str(e)}")
+            return None
+
+    def split_from_boundaries(self, audio_path, original_text, ordinal_number, boundaries, audio_bytes=None):
+        """Split a sentence we synthesized ourselves using the TTS word-boundary timings.
+
+        Produces the same clips, word_data records and mismatch entries as
+        split_audio_file, without a Vosk model or WAV conversion.
+        """
+        try:
+            print(f"Processing audio: {audio_path}")
+
+            original_words = original_text.lower().strip().split()
+            audio = self.load_clip_source(audio_path, audio_bytes)
+            duration_ms = audio.duration_ms if isinstance(audio, Mp3Frames) else len(audio)
+            matched, extras, substitutions = match_boundaries(original_words, boundaries,
+                                                              duration=duration_ms / 1000)
+
+            # The same rule and report as split_audio_file's alignment
+            unheard = [m['word'] for m in matched if m is not None and m.get('interpolated')]
+            word_count_match = not (substitutions or unheard or extras)
+            if not word_count_match:
+                self.record_mismatch(audio_path, original_text, original_words, boundaries,
+                                     substitutions, unheard=unheard, extras=extras)
+
+            result = self.write_word_clips(audio, original_words, ordinal_number, matched, extras)
+            result['word_count_match'] = word_count_match
+            result['text'] = ' '.join(b['word'] for b in boundaries)
+            return result
+
+        except Exception as e:
+            print(f"Error processing audio file: {str(e)}")
+            return None
+
+    def record_mismatch(self, audio_path, original_text, original_words, words_with_times, substitutions=None,
+                        unheard=None, extras=None, note=None):
+        """Add a file whose detected words don't line up with its text to the mismatch report.
+
+        With alignment, substitutions, unheard (words given interpolated timings)
+        and extras (recognized words matching no original word) say what differs;
+        note explains a file reported for another reason.
+        """
+        detected_words = [w['word'] for w in words_with_times]
+        mismatch = {
+            'filename': Path(audio_path).name,
+            'original_text': original_text,
+            'detected_text': ' '.join(detected_words),
+            'original_word_count': len(original_words),
+            'detected_word_count': len(detected_words),
+            'detected_words': detected_words
+        }
+        if substitutions is not None:
+            mismatch['substitutions'] = substitutions
+            mismatch['unheard_words'] = unheard or []
+            mismatch['extra_words'] = [w['word'] for w in extras or []]
+        if note is not None:
+            mismatch['note'] = note
+        self.add_mismatch(mismatch)
+        if note is not None:
+            print(f"Warning: {note}")
+            return
+        if substitutions is not None:
+            if substitutions:
+                print(f"Warning: {len(substitutions)} word(s) heard differently: "
+                      + ", ".join(f"{s['original']} -> {s['detected']}" for s in substitutions))
+            if unheard:
+                print(f"Warning: {len(unheard)} word(s) not heard, timings interpolated: {unheard}")
+            if extras:
+                print(f"Warning: {len(extras)} extra word(s) heard: {mismatch['extra_words']}")
+            return
+        print(f"Warning: Word count mismatch!")
+        print(f"Original words ({len(original_words)}): {original_words}")
+        print(f"Detected words ({len(detected_words)}): {detected_words}")
+
+    def cut_word(self, audio, timing):
+        """Cut one word out of the sentence audio with 100 ms of silence on each side"""
+        start_time = int(timing['start'] * 1000)
+        end_time = int(timing['end'] * 1000)
+
+        if isinstance(audio, Mp3Frames):
+            return audio.cut(start_time, end_time, pad_ms=100)
+        from pydub import AudioSegment
+        from pcmBuffer import PcmBuffer
+        if isinstance(audio, PcmBuffer):
+            return audio[start_time:end_time].pad(100)
+
+        word_audio = audio[start_time:end_time]
+        silence = AudioSegment.silent(duration=100)
+        return silence + word_audio + silence
+
+    def save_clip(self, word_audio, full_filename):
+        """Write a word clip: frame-cut clips are already mp3 bytes, others are queued for encoding"""
+        if isinstance(word_audio, bytes):
+            full_filename.write_bytes(word_audio)
+        else:
+            self.exporter.add(word_audio, full_filename)
+
+    def flush_clips(self):
+        """Encode the queued clips, in one ffmpeg run for a typical sentence"""
+        self.exporter.flush()
+
+    def word_file_name(self, word_number):
+        return f"ENGA1X{word_number:06d}-0200"
+
+    def extra_file_name(self, last_word_number, extra_number):
+        return f"ENGA1X{last_word_number}_{extra_number}-0200"
+
+    def write_word_clips(self, audio, original_words, ordinal_number, matched, extras):
+        """Export a clip per timed word and collect the word_data records.
+
+        matched holds one timing (or None when the word wasn't found) per original
+        word; extras are timings left over after matching and get _X suffix names.
+        """
+        word_files = []
+    
+        # Create a list to store all words (detected and missing)
+        all_words_data = []
         
-            # Now process any extra detected words
-            last_original_word_number = self.current_word_number - 1
-            for i in range(original_word_count, detected_word_count):
-                vosk_data = words_with_times[i]
-                extra_word = vosk_data['word']
-                
-                # Create filename with _X suffix for extra words
-                extra_number = i - original_word_count + 1
-                filename = f"ENGA1X{last_original_word_number}_{extra_number}-0200"
-                
-                word_data = {
-                    'word': extra_word,
-                    'fileName': filename,
-                    'ordinalNumber': ordinal_number,
-                    'wordIndex': i,
-                    'originalWord': extra_word,
-                    'detected': True,
-                'isExtra': True
+        # First, process the original words
+        for i, original_word in enumerate(original_words):
+            filename = self.word_file_name(self.current_word_number)
+            
+            word_data = {
+                'word': original_word,
+                'fileName': filename,
+                'ordinalNumber': ordinal_number,
+                'wordIndex': i,
+                'originalWord': original_word,
+                'detected': False,
+                'isExtra': False
             }
-                
-                # Create audio file for extra word
-                start_time = int(vosk_data['start'] * 1000)
-                end_time = int(vosk_data['end'] * 1000)
-                
-                word_audio = audio[start_time:end_time]
-                silence = AudioSegment.silent(duration=100)
-                word_audio = silence + word_audio + silence
-                
+        
+            # Only create audio file if word was detected
+            if matched[i] is not None:
+                word_audio = self.cut_word(audio, matched[i])
+            
                 full_filename = self.output_dir / f"{filename}.mp3"
-                word_audio.export(str(full_filename), format="mp3")
+                self.save_clip(word_audio, full_filename)
                 word_files.append(full_filename)
             
-                all_words_data.append(word_data)
-        
-            # Add all words to the Excel data
-            self.word_data.extend(all_words_data)
+                # Interpolated timings are a best guess for a word the recognizer missed
+                word_data['detected'] = not matched[i].get('interpolated', False)
         
-            # Clean up
-            os.remove(wav_path)
-        
-            return {
-                'word_files': word_files,
-                'all_words_data': all_words_data,
-                'word_count_match': detected_word_count == original_word_count,
-                'text': ' '.join(w['word'] for w in words_with_times)
+            all_words_data.append(word_data)
+            self.current_word_number += 1
+    
+        # Now process any extra detected words
+        last_original_word_number = self.current_word_number - 1
+        for extra_number, extra in enumerate(extras, start=1):
+            extra_word = extra['word']
+            
+            # Create filename with _X suffix for extra words
+            filename = self.extra_file_name(last_original_word_number, extra_number)
+            
+            word_data = {
+                'word': extra_word,
+                'fileName': filename,
+                'ordinalNumber': ordinal_number,
+                'wordIndex': len(original_words) + extra_number - 1,
+                'originalWord': extra_word,
+                'detected': True,
+                'isExtra': True
             }
+            
+            # Create audio file for extra word
+            word_audio = self.cut_word(audio, extra)
+            
+            full_filename = self.output_dir / f"{filename}.mp3"
+            self.save_clip(word_audio, full_filename)
+            word_files.append(full_filename)
         
-        except Exception as e:
-            print(f"Error processing audio file: {str(e)}")
-            return None
+            all_words_data.append(word_data)
+    
+        self.flush_clips()
+
+        # Add all words to the Excel data
+        self.add_word_data(all_words_data)
+
+        return {
+            'word_files': word_files,
+            'all_words_data': all_words_data,
+        }
+
+    def add_word_data(self, entries):
+        if self.sink is not None:
+            self.sink.write_words(entries)
+        else:
+            self.word_data.extend(entries)
+
+    def add_mismatch(self, mismatch):
+        if self.sink is not None:
+            self.sink.write_mismatch(mismatch)
+        else:
+            self.mismatches.append(mismatch)
+
+    @property
+    def word_count(self):
+        """Word records produced so far, in memory or in the sink"""
+        return self.sink.word_count if self.sink is not None else len(self.word_data)
 
     def save_excel(self, output_file):
-        """Save word data to Excel file"""
+        """Save word data to Excel file, renumbered to ENGB1X names (the records themselves are left as they are)"""
         try:
-            print(f"\nAttempting to save {len(self.word_data)} words to Excel...")
-            
-            filtered_word_data = []
-            current_sequence = 1
-            current_ordinal = None
-            has_hyphen = False
-            
-            for entry in self.word_data:
-                # Check if we're starting a new sentence
-                if current_ordinal != entry['ordinalNumber']:
-                    if has_hyphen:
-                        # If previous sentence had a hyphen, increment sequence to maintain gap
-                        current_sequence += 1
-                    current_ordinal = entry['ordinalNumber']
-                    has_hyphen = False
-                
-                if entry['word'] in ['-', '–', '—']:
-                    has_hyphen = True
-                    continue
-                
-                # Update the filename while keeping the -0810 suffix
-                original_filename = entry['fileName']
-                suffix = original_filename.split('-')[1]  # Get the '0810' part
-                new_filename = f"ENGB1X{current_sequence:06d}-{suffix}"
-                entry['fileName'] = new_filename
-                filtered_word_data.append(entry)
-                current_sequence += 1
-            
-            df = pd.DataFrame(filtered_word_data)
-            print("DataFrame created successfully")
-            print("DataFrame contents:")
-            print(df.head())  # Show first few rows
-            
-            df.to_excel(output_file, index=False)
-            print(f"Excel file saved to: {output_file}")
+            print(f"\nAttempting to save {self.word_count} words to Excel...")
+            entries = self.sink.iter_words() if self.sink is not None else self.word_data
+            rows = write_word_excel(entries, output_file)
+            print(f"Excel file saved to: {output_file} ({rows} rows)")
         except Exception as e:
             print(f"Error saving Excel file: {str(e)}")
             print(f"Current working directory: {os.getcwd()}")
@@ -235,12 +428,174 @@ class AudioSplitter:
 
     def save_mismatches(self, output_file):
         """Save mismatches to a JSON file"""
+        if self.sink is not None:
+            self.sink.export_mismatches(output_file)
+            return
         with open(output_file, 'w', encoding='utf-8') as f:
             json.dump({
                 'mismatches': self.mismatches
             }, f, indent=2, ensure_ascii=False)
 
-def process_audio_folder():
+def split_from_synthesis(results, output_dir):
+    """Cut word clips for sentences main.py just synthesized with capture_boundaries=True.
+
+    No Vosk model is loaded: the word timings come from the TTS engine itself.
+    Writes word_data.xlsx and text_mismatches.json next to the clips.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    splitter = AudioSplitter(output_dir=str(output_dir), model_path=None)
+
+    for result in results:
+        split = splitter.split_from_boundaries(
+            str(result['sentence_file']),
+            result['text'],
+            result['id'],
+            result.get('boundaries', []),
+            audio_bytes=result.get('audio'),
+        )
+        if split:
+            print(f"Created {len(split['word_files'])} word files")
+
+    splitter.save_mismatches(output_dir / "text_mismatches.json")
+    splitter.save_excel(output_dir / "word_data.xlsx")
+    return splitter
+
+# Worker processes for split_files: each loads the Vosk model once, in _init_worker
+_worker_splitter = None
+_worker_staging_dir = None
+
+
+def _init_worker(staging_dir, model_path, frame_cut, use_grammar, alignment, energy_fallback):
+    global _worker_splitter, _worker_staging_dir
+    _worker_staging_dir = Path(staging_dir)
+    _worker_splitter = AudioSplitter(output_dir=staging_dir, model_path=model_path, frame_cut=frame_cut,
+                                     use_grammar=use_grammar, alignment=alignment, energy_fallback=energy_fallback)
+
+
+def _split_batch(batch):
+    """Split a batch of (index, audio path, text, ordinal) jobs in a worker.
+
+    Every file gets its own staging folder and word numbers starting at 1; the
+    coordinator renumbers them (_merge_worker_output) once earlier files are in.
+    """
+    splitter = _worker_splitter
+    outputs = []
+    for index, audio_path, original_text, ordinal_number in batch:
+        staging = _worker_staging_dir / f"{index:06d}"
+        staging.mkdir(parents=True, exist_ok=True)
+        splitter.output_dir = staging
+        splitter.current_word_number = 1
+        splitter.word_data = []
+        splitter.mismatches = []
+        try:
+            result = splitter.split_audio_file(str(audio_path), original_text, ordinal_number)
+        except Exception as e:
+            print(f"Error processing file {Path(audio_path).name}: {e}")
+            result = None
+        outputs.append({
+            'result': result,
+            'word_data': splitter.word_data,
+            'mismatches': splitter.mismatches,
+            'word_count': len(original_text.lower().strip().split()),
+            'consumed': splitter.current_word_number - 1,
+            'staging_dir': staging,
+        })
+    return outputs
+
+
+def _merge_worker_output(splitter, output):
+    """Give a worker's clips the names a serial run would have, and move them into place"""
+    offset = splitter.current_word_number - 1
+    staging = output['staging_dir']
+    word_files = []
+    for entry in output['word_data']:
+        if entry['isExtra']:
+            extra_number = entry['wordIndex'] - output['word_count'] + 1
+            final_name = splitter.extra_file_name(offset + output['word_count'], extra_number)
+        else:
+            final_name = splitter.word_file_name(offset + entry['wordIndex'] + 1)
+        staged = staging / f"{entry['fileName']}.mp3"
+        if staged.exists():
+            target = splitter.output_dir / f"{final_name}.mp3"
+            os.replace(staged, target)
+            word_files.append(target)
+        entry['fileName'] = final_name
+
+    splitter.add_word_data(output['word_data'])
+    for mismatch in output['mismatches']:
+        splitter.add_mismatch(mismatch)
+    splitter.current_word_number += output['consumed']
+    shutil.rmtree(staging, ignore_errors=True)
+
+    result = output['result']
+    if result:
+        result['word_files'] = word_files
+        result['all_words_data'] = output['word_data']
+    return result
+
+
+def split_files(splitter, jobs, workers=1, model_path=None, batch_size=8):
+    """Run split_audio_file over (index, audio path, text, ordinal) jobs; yields (job, result) in job order.
+
+    With workers > 1 the files are split by a process pool, batch_size files per
+    task, and merged back into splitter in order: clip names, word_data and
+    mismatches come out exactly as from a serial run.
+    """
+    if workers <= 1:
+        for job in jobs:
+            _, audio_file, original_text, ordinal_number = job
+            print(f"\nProcessing: {Path(audio_file).name}")
+            yield job, splitter.split_audio_file(str(audio_file), original_text, ordinal_number)
+        return
+
+    staging_dir = splitter.output_dir / ".staging"
+    batches = [jobs[i:i + batch_size] for i in range(0, len(jobs), batch_size)]
+    print(f"Splitting {len(jobs)} files in {workers} worker processes")
+    try:
+        with Pool(workers, initializer=_init_worker,
+                  initargs=(str(staging_dir), str(model_path), splitter.frame_cut, splitter.use_grammar,
+                            splitter.alignment, splitter.energy_fallback)) as pool:
+            for batch, outputs in zip(batches, pool.imap(_split_batch, batches)):
+                for job, output in zip(batch, outputs):
+                    print(f"\nProcessed: {Path(job[1]).name}")
+                    yield job, _merge_worker_output(splitter, output)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def save_checkpoint(path, next_index, last_file, splitter):
+    """Record how far process_audio_folder has got: the next file, the word counter and the sink offsets.
+
+    Written to a temp file and renamed over the old one, so a crash leaves
+    either the previous checkpoint or this one.
+    """
+    checkpoint = {
+        'next_index': next_index,
+        'last_file': last_file,
+        'current_word_number': splitter.current_word_number,
+        'sink': splitter.sink.offsets(),
+    }
+    tmp_path = path.with_name(f".{path.name}.part")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+INPUT_DIR = Path.home() / "Downloads" / "audios" / "EmmaUSgaps"
+OUTPUT_DIR = Path.home() / "Downloads" / "EmmaUSgapsWORDS"
+
+
+def process_audio_folder(resume=False, input_dir=INPUT_DIR, output_dir=OUTPUT_DIR, workers=None, dry_run=False):
+    if workers is None:
+        workers = WORKERS
     try:
         # Get absolute path to the model directory
         current_dir = Path(__file__).parent
@@ -258,20 +613,52 @@ def process_audio_folder():
             print(f"Error loading sentences.json: {e}")
             return
 
+        if dry_run:
+            # Check the inputs without loading the model or writing anything
+            audio_files = sorted(Path(input_dir).glob("ENGB1*.mp3"))
+            print(f"Dry run: {len(audio_files)} audio files in {input_dir}, {len(sentences)} sentences; "
+                  f"{min(len(audio_files), len(sentences))} would be split into {output_dir}")
+            checkpoint_path = Path(input_dir) / "checkpoint.json"
+            if checkpoint_path.exists():
+                checkpoint = load_checkpoint(checkpoint_path)
+                print(f"Checkpoint: --resume would continue after {checkpoint['last_file']}")
+            try:
+                check_model_path(model_path)
+                print(f"Model found at {model_path}")
+            except Exception as e:
+                print(e)
+            return
+
         try:
-            # Initialize splitter
+            # Initialize splitter; with worker processes the model is loaded in each worker instead
+            if workers > 1:
+                check_model_path(model_path)
             splitter = AudioSplitter(
-                output_dir=str(Path.home() / "Downloads" / "EmmaUSgapsWORDS"),
-                model_path=model_path
+                output_dir=str(output_dir),
+                model_path=model_path if workers <= 1 else None,
+                use_grammar=USE_GRAMMAR,
+                energy_fallback=ENERGY_FALLBACK
             )
         except Exception as e:
             print(f"Error initializing AudioSplitter: {e}")
             return
 
         # Directory containing the sentence audio files
-        input_dir = Path.home() / "Downloads" / "audios" / "EmmaUSgaps"
+        input_dir = Path(input_dir)
         print(f"Looking for audio files in: {input_dir}")
-        
+        # Progress after every file, for --resume
+        checkpoint_path = input_dir / "checkpoint.json"
+        checkpoint = None
+        if resume:
+            if checkpoint_path.exists():
+                checkpoint = load_checkpoint(checkpoint_path)
+                print(f"Resuming after {checkpoint['last_file']} (file {checkpoint['next_index']}, "
+                      f"next word number {checkpoint['current_word_number']})")
+            else:
+                print(f"No checkpoint at {checkpoint_path}; starting from the beginning")
+        elif checkpoint_path.exists():
+            checkpoint_path.unlink()
+
         try:
             audio_files = list(sorted(input_dir.glob("ENGB1*.mp3")))
             print(f"Found {len(audio_files)} audio files")
@@ -279,74 +666,77 @@ def process_audio_folder():
             print(f"Error finding audio files: {e}")
             return
 
-        # Process all mp3 files in the input directory
+        start_index = 0
+        if checkpoint:
+            start_index = checkpoint['next_index']
+            if (start_index == 0 or start_index > len(audio_files)
+                    or audio_files[start_index - 1].name != checkpoint['last_file']):
+                print(f"Checkpoint doesn't match the files in {input_dir} "
+                      f"(expected {checkpoint['last_file']} at position {start_index}); not resuming")
+                return
+
+        # Word records and mismatches are streamed to input_dir as files finish; opened only
+        # once the checkpoint is known to fit, as resuming truncates them to its offsets
+        splitter.sink = WordSink(input_dir, resume_from=checkpoint['sink'] if checkpoint else None)
+        if checkpoint:
+            splitter.current_word_number = checkpoint['current_word_number']
+
         try:
-            for i, audio_file in enumerate(audio_files):
-            # for i, audio_file in enumerate(audio_files[1200:], start=1200):
-                try:
-                    print(f"\nProcessing: {audio_file.name}")
-                    
-                    # Extract ordinal number from filename
-                    ordinal_match = re.search(r'ENGB1(\d+)', audio_file.name)
-                    ordinal_number = int(ordinal_match.group(1)) if ordinal_match else i + 1
-                    
-                    # Get corresponding sentence
-                    if i < len(sentences):
-                        original_text = sentences[i]
-                        result = splitter.split_audio_file(str(audio_file), original_text, ordinal_number)
-                        
+            # Pair each mp3 file with its sentence
+            jobs = []
+            for i, audio_file in enumerate(audio_files[start_index:], start=start_index):
+                # Extract ordinal number from filename
+                ordinal_match = re.search(r'ENGB1(\d+)', audio_file.name)
+                ordinal_number = int(ordinal_match.group(1)) if ordinal_match else i + 1
+
+                # Get corresponding sentence
+                if i < len(sentences):
+                    jobs.append((i, audio_file, sentences[i], ordinal_number))
+                else:
+                    print(f"Warning: No corresponding sentence found for {audio_file.name}")
+
+            # Process all mp3 files in the input directory
+            try:
+                for (i, audio_file, original_text, ordinal_number), result in split_files(
+                        splitter, jobs, workers=workers, model_path=model_path):
+                    try:
                         if result:
                             print(f"Created {len(result['word_files'])} word files")
                             if 'text' in result:
                                 print(f"Original text: {original_text}")
                                 print(f"Detected text: {result['text']}")
-                            print(f"Current word_data length: {len(splitter.word_data)}")
-                            
-                            # Save Excel and mismatches every 100 files
-                            if (i + 1) % 500 == 0:
-                                try:
-                                    # Save partial Excel
-                                    excel_file = input_dir / f"word_data_partial_{i+1}.xlsx"
-                                    print(f"\nSaving partial Excel file to: {excel_file}")
-                                    splitter.save_excel(excel_file)
-                                    print(f"Partial Excel file saved successfully")
-                                    
-                                    # Save partial mismatches
-                                    mismatches_file = input_dir / f"text_mismatches_partial_{i+1}.json"
-                                    splitter.save_mismatches(mismatches_file)
-                                    print(f"Partial mismatches saved to: {mismatches_file}")
-                                except Exception as e:
-                                    print(f"Error saving partial files: {e}")
-                    else:
-                        print(f"Warning: No corresponding sentence found for {audio_file.name}")
-                except Exception as e:
-                    print(f"Error processing file {audio_file.name}: {e}")
-                    continue
-        except Exception as e:
-            print(f"Error in main processing loop: {e}")
+                            print(f"Current word_data length: {splitter.word_count}")
+                    except Exception as e:
+                        print(f"Error processing file {audio_file.name}: {e}")
+                    save_checkpoint(checkpoint_path, i + 1, audio_file.name, splitter)
+            except Exception as e:
+                print(f"Error in main processing loop: {e}")
 
-        print("\nFinished processing audio files")
-        print(f"Final word_data count: {len(splitter.word_data)}")
+            print("\nFinished processing audio files")
+            print(f"Final word_data count: {splitter.word_count}")
 
-        try:
-            # Save final mismatches to JSON file
-            mismatches_file = input_dir / "text_mismatches.json"
-            splitter.save_mismatches(mismatches_file)
-            print(f"Final mismatches saved to: {mismatches_file}")
-        except Exception as e:
-            print(f"Error saving final mismatches: {e}")
+            try:
+                # Save final mismatches to JSON file
+                mismatches_file = input_dir / "text_mismatches.json"
+                splitter.save_mismatches(mismatches_file)
+                print(f"Final mismatches saved to: {mismatches_file}")
+            except Exception as e:
+                print(f"Error saving final mismatches: {e}")
 
-        try:
-            # Save final word data to Excel file
-            excel_file = input_dir / "word_data.xlsx"
-            print(f"\nAttempting to save final Excel file to: {excel_file}")
-            print(f"Total words processed: {len(splitter.word_data)}")
-            splitter.save_excel(excel_file)
-            print(f"Final Excel file saved successfully")
-        except Exception as e:
-            print(f"Error saving final Excel file: {e}")
-            import traceback
-            traceback.print_exc()
+            try:
+                # Save final word data to Excel file
+                excel_file = input_dir / "word_data.xlsx"
+                print(f"\nAttempting to save final Excel file to: {excel_file}")
+                print(f"Total words processed: {splitter.word_count}")
+                splitter.save_excel(excel_file)
+                print(f"Final Excel file saved successfully")
+            except Exception as e:
+                print(f"Error saving final Excel file: {e}")
+                import traceback
+                traceback.print_exc()
+        finally:
+            # Flush whatever was written, also when the loop above raised
+            splitter.sink.close()
 
     except Exception as e:
         print(f"Critical error in process_audio_folder: {e}")
@@ -362,4 +752,8 @@ def process_audio_folder():
         print("3. The model folder contains all necessary files (am/, conf/, etc.)")
 
 if __name__ == "__main__":
-    process_audio_folder()
+    parser = argparse.ArgumentParser(description="Split the sentence recordings into word clips")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted run from its checkpoint.json, with the same numbering")
+    args = parser.parse_args()
+    process_audio_folder(resume=args.resume)
@@ -1,15 +1,18 @@
-import os
 from pathlib import Path
 import shutil
 from pydub import AudioSegment
-import json
-from vosk import Model, KaldiRecognizer
-import wave
+from vosk import Model
+from mp3Frames import Mp3Frames
+from clipExport import ClipExporter
+from pcmBuffer import PcmBuffer, pads_like_pydub
+from voskIngest import recognizer_pcm, recognize_pcm
 
 class AudioSplitter:
-    def __init__(self, output_dir="audio_output", model_path="model"):
+    def __init__(self, output_dir="audio_output", model_path="model", frame_cut=False):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
+        # Cut word clips on mp3 frame boundaries instead of decoding and re-encoding them
+        self.frame_cut = frame_cut
         
         # More detailed model path checking
         model_path = Path(model_path)
@@ -37,56 +40,36 @@ class AudioSplitter:
         """Create a safe filename from text"""
         return "".join(x for x in text if x.isalnum() or x in "._- ")
 
-    def convert_to_wav(self, audio_path):
-        """Convert audio to WAV format with required parameters"""
-        audio = AudioSegment.from_file(audio_path)
-        wav_path = str(self.output_dir / "temp.wav")
-        audio.export(wav_path, format="wav", parameters=["-ar", "16000", "-ac", "1"])
-        return wav_path
-
-    def get_word_timestamps(self, wav_path):
-        """Get word timestamps using Vosk"""
-        wf = wave.open(wav_path, "rb")
-        rec = KaldiRecognizer(self.model, wf.getframerate())
-        rec.SetWords(True)
-
-        words_with_times = []
-        while True:
-            data = wf.readframes(512)
-            if len(data) == 0:
-                break
-            if rec.AcceptWaveform(data):
-                result = json.loads(rec.Result())
-                if 'result' in result:
-                    words_with_times.extend(result['result'])
-
-        # Get final result
-        result = json.loads(rec.FinalResult())
-        if 'result' in result:
-            words_with_times.extend(result['result'])
-
-        return words_with_times
+    def get_word_timestamps(self, pcm):
+        """Get word timestamps using Vosk, from 16 kHz mono PCM bytes"""
+        return recognize_pcm(self.model, pcm)
 
     def split_audio_file(self, audio_path, text=None):
         """Split audio file into words using speech recognition"""
         try:
             print(f"Processing audio: {audio_path}")
             
-            # Convert audio to WAV format
-            wav_path = self.convert_to_wav(audio_path)
+            # Decode once, in memory; the same audio is used for the word clips
+            decoded = AudioSegment.from_file(audio_path)
             
             # Get word timestamps
-            words_with_times = self.get_word_timestamps(wav_path)
-            
-            # Load the original audio
-            audio = AudioSegment.from_file(audio_path)
+            words_with_times = self.get_word_timestamps(recognizer_pcm(decoded))
             
             # Create output files
             word_files = []
             
             # Save the original file
             original_filename = self.output_dir / f"original_audio.mp3"
-            audio.export(str(original_filename), format="mp3")
+            # Batches the re-encoded clips; frame-cut clips are written directly
+            exporter = None
+            if self.frame_cut:
+                audio = Mp3Frames.from_file(audio_path)
+                shutil.copyfile(audio_path, original_filename)
+            else:
+                exporter = ClipExporter()
+                exporter.add(decoded, original_filename)
+                # Word clips are cut from a view of the decoded samples, not copies of them
+                audio = PcmBuffer.from_segment(decoded) if pads_like_pydub(decoded) else decoded
             word_files.append(original_filename)
             
             # Split and save individual words
@@ -94,22 +77,29 @@ class AudioSplitter:
                 start_time = int(word_data['start'] * 1000)  # Convert to milliseconds
                 end_time = int(word_data['end'] * 1000)
                 word = word_data['word']
+                filename = self.output_dir / f"word_{i}_{self.clean_filename(word)}.mp3"
                 
-                # Extract word segment
-                word_audio = audio[start_time:end_time]
+                if self.frame_cut:
+                    # Copy the word's frames, padded with silent frames
+                    filename.write_bytes(audio.cut(start_time, end_time, pad_ms=100))
+                    word_files.append(filename)
+                    continue
                 
-                # Add small silence padding
-                silence = AudioSegment.silent(duration=100)
-                word_audio = silence + word_audio + silence
+                # Extract word segment with small silence padding
+                if isinstance(audio, PcmBuffer):
+                    word_audio = audio[start_time:end_time].pad(100)
+                else:
+                    word_audio = audio[start_time:end_time]
+                    silence = AudioSegment.silent(duration=100)
+                    word_audio = silence + word_audio + silence
                 
-                # Save word audio
-                filename = self.output_dir / f"word_{i}_{self.clean_filename(word)}.mp3"
-                word_audio.export(str(filename), format="mp3")
+                # Save word audio (encoded together with the others below)
+                exporter.add(word_audio, filename)
                 word_files.append(filename)
             
-            # Clean up temporary WAV file
-            os.remove(wav_path)
-            
+            if exporter is not None:
+                exporter.flush()
+
             return {
                 'original_file': original_filename,
                 'word_files': word_files[1:],  # Exclude original file
@@ -0,0 +1,271 @@
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+from pathlib import Path
+
+from pydub import AudioSegment
+from pydub.generators import Sine
+
+import aToWVosk
+from voskIngest import RECOGNIZER_RATE
+
+try:
+    import resource
+except ImportError:  # Windows: no child CPU time or peak RSS
+    resource = None
+
+ROOT = Path(__file__).resolve().parent
+FIXTURE_GLOBS = ["thomas/*.mp3", "words/*.mp3", "Downloads/audios/USAvaUSZSAMPLES/*.mp3"]
+# Methods of aToWVosk.AudioSplitter timed as a stage each, in pipeline order
+STAGES = [
+    ("load_audio", "decode"),
+    ("pcm_for_recognizer", "resample"),
+    ("get_word_timestamps", "recognition"),
+    ("energy_word_timestamps", "recognition"),
+    ("load_clip_source", "clip_source"),
+    ("cut_word", "slicing"),
+    ("save_clip", "export"),
+    ("flush_clips", "export"),
+]
+RESULTS_DIR = ROOT / "bench_results"
+
+
+def _cpu_seconds():
+    """CPU time of this process plus finished children (the ffmpeg runs pydub starts)"""
+    if resource is None:
+        return time.process_time()
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def _peak_rss_mb(who):
+    """Peak resident set size in MB (largest single child for RUSAGE_CHILDREN), None on Windows"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+class StageTimer:
+    """Accumulates wall and CPU time per stage by wrapping a splitter's methods.
+
+    Nested calls are charged to the outer stage only, so stage times add up to no
+    more than the total.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self._depth = 0
+
+    def wrap(self, obj, method_name, stage):
+        method = getattr(obj, method_name)
+        totals = self.stages.setdefault(stage, {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0})
+
+        def timed(*args, **kwargs):
+            if self._depth:
+                return method(*args, **kwargs)
+            self._depth += 1
+            wall, cpu = time.perf_counter(), _cpu_seconds()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                totals['calls'] += 1
+                totals['wall_seconds'] += time.perf_counter() - wall
+                totals['cpu_seconds'] += _cpu_seconds() - cpu
+                self._depth -= 1
+
+        setattr(obj, method_name, timed)
+
+
+def even_timestamps(pcm, word_count):
+    """Word timings spread evenly over a file, standing in for Vosk when no model is loaded"""
+    duration = len(pcm) / (2 * RECOGNIZER_RATE)
+    slot = duration / max(1, word_count)
+    return [{'word': f"w{i + 1}", 'start': i * slot, 'end': (i + 0.8) * slot, 'conf': 1.0}
+            for i in range(word_count)]
+
+
+def fixture_files():
+    """(path, sentence) for every fixture recording whose text is known, and the paths of the others.
+
+    A recording's text is the sentence in the sentences.json next to it at the
+    ordinal in its name (ENGB1000003-0000.mp3 is the third), the way
+    aToWVosk pairs them. Without a text nothing would be matched or exported,
+    so those recordings are left out of the run.
+    """
+    files = []
+    skipped = []
+    for pattern in FIXTURE_GLOBS:
+        for path in sorted(ROOT.glob(pattern)):
+            sentences_file = path.parent / "sentences.json"
+            ordinal = re.search(r"(\d{6})(?:-\d+)?$", path.stem)
+            sentences = []
+            if sentences_file.exists():
+                with open(sentences_file, 'r', encoding='utf-8') as f:
+                    sentences = json.load(f)['sentences']
+            index = int(ordinal.group(1)) - 1 if ordinal else -1
+            text = sentences[index] if 0 <= index < len(sentences) else None
+            if isinstance(text, dict):
+                text = text.get('s')
+            if text and str(text).strip():
+                files.append((path, str(text).strip()))
+            else:
+                skipped.append(path)
+    return files, skipped
+
+
+def synthetic_files(folder, count, words_per_file=8, seed=0):
+    """Write count mp3 files of tone bursts ("words") separated by short silences"""
+    rng = random.Random(seed)
+    folder.mkdir(parents=True, exist_ok=True)
+    files = []
+    for n in range(count):
+        audio = AudioSegment.silent(duration=150, frame_rate=24000)
+        words = []
+        for w in range(words_per_file):
+            tone = Sine(rng.uniform(150, 400), sample_rate=24000).to_audio_segment(duration=rng.randint(180, 520))
+            gap = AudioSegment.silent(duration=rng.randint(80, 200), frame_rate=24000)
+            audio += tone.apply_gain(-8).set_channels(1) + gap
+            words.append(f"word{w + 1}")
+        path = folder / f"SYNTH{n + 1:06d}.mp3"
+        audio.export(str(path), format="mp3", bitrate="48k")
+        files.append((path, " ".join(words)))
+    return files
+
+
+def run_dataset(name, files, args, work_dir):
+    output_dir = Path(work_dir) / name
+    model_load = time.perf_counter()
+    splitter = aToWVosk.AudioSplitter(output_dir=str(output_dir), model_path=args.model, frame_cut=args.frame_cut,
+                                      use_grammar=args.grammar, energy_fallback=args.energy)
+    model_load = time.perf_counter() - model_load
+
+    word_count = {'current': args.words_per_file}
+    if splitter.model is None and not args.energy:
+        # No model: keep every other stage, with evenly spaced words in place of recognition
+        splitter.get_word_timestamps = lambda pcm, grammar=None: even_timestamps(pcm, word_count['current'])
+
+    timer = StageTimer()
+    for method_name, stage in STAGES:
+        if method_name == "get_word_timestamps" and splitter.model is None:
+            continue
+        timer.wrap(splitter, method_name, stage)
+
+    clips = 0
+    failed = 0
+    wall, cpu = time.perf_counter(), _cpu_seconds()
+    for ordinal, (audio_path, text) in enumerate(files, start=1):
+        word_count['current'] = len(text.split()) or args.words_per_file
+        result = splitter.split_audio_file(str(audio_path), text, ordinal)
+        if result is None:
+            failed += 1
+        else:
+            clips += len(result['word_files'])
+    wall, cpu = time.perf_counter() - wall, _cpu_seconds() - cpu
+
+    return {
+        'files': len(files),
+        'failed_files': failed,
+        'clips': clips,
+        'model_load_seconds': model_load if splitter.model is not None else None,
+        'recognition': "vosk" if splitter.model is not None else "energy" if args.energy else "even-split stand-in",
+        'wall_seconds': wall,
+        'cpu_seconds': cpu,
+        'files_per_second': len(files) / wall if wall else None,
+        'clips_per_second': clips / wall if wall else None,
+        'stages': timer.stages,
+    }
+
+
+def compare(current, baseline):
+    """Print per-stage wall time of current next to a saved baseline run"""
+    print(f"\nCompared with {baseline['started']}:")
+    for name, dataset in current['datasets'].items():
+        before = baseline['datasets'].get(name)
+        if not before:
+            continue
+        print(f"  {name}: {before['wall_seconds']:.2f}s -> {dataset['wall_seconds']:.2f}s")
+        for stage, totals in dataset['stages'].items():
+            old = before['stages'].get(stage)
+            if old and old['wall_seconds']:
+                change = totals['wall_seconds'] / old['wall_seconds'] - 1
+                print(f"    {stage:15s} {old['wall_seconds']:8.2f}s -> {totals['wall_seconds']:8.2f}s ({change:+.0%})")
+
+
+def print_dataset(name, result):
+    print(f"\n{name}: {result['files']} files, {result['clips']} clips in {result['wall_seconds']:.2f}s "
+          f"({result['files_per_second']:.2f} files/s, CPU {result['cpu_seconds']:.2f}s, "
+          f"recognition: {result['recognition']})")
+    for stage, totals in result['stages'].items():
+        share = totals['wall_seconds'] / result['wall_seconds'] if result['wall_seconds'] else 0
+        print(f"  {stage:15s} {totals['wall_seconds']:8.2f}s wall {totals['cpu_seconds']:8.2f}s CPU "
+              f"{totals['calls']:6d} calls  {share:5.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the stages of aToWVosk.AudioSplitter.split_audio_file")
+    parser.add_argument("--model", default=str(ROOT / "model"),
+                        help="Vosk model folder; when missing, recognition is replaced by evenly spaced words")
+    parser.add_argument("--grammar", action="store_true", help="limit recognition to each file's sentence words")
+    parser.add_argument("--energy", action="store_true",
+                        help="time words from silences (silenceSplit) when Vosk hears nothing or there is no model")
+    parser.add_argument("--frame-cut", action="store_true", help="benchmark the mp3 frame-cutting mode")
+    parser.add_argument("--synthetic", type=int, default=20, help="number of generated tone files (0 to skip)")
+    parser.add_argument("--words-per-file", type=int, default=8)
+    parser.add_argument("--output", type=Path, default=None, help="results JSON (default bench_results/<time>.json)")
+    parser.add_argument("--compare", type=Path, default=None, help="an earlier results JSON to compare against")
+    args = parser.parse_args()
+    if not Path(args.model).exists():
+        print(f"No Vosk model at {args.model}; timing recognition-free runs")
+        args.model = None
+
+    report = {
+        'started': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'frame_cut': args.frame_cut,
+        'grammar': args.grammar,
+        'energy': args.energy,
+        'datasets': {},
+    }
+    with tempfile.TemporaryDirectory() as work_dir:
+        datasets = {}
+        fixtures, skipped = fixture_files()
+        report['skipped_fixtures'] = [str(path.relative_to(ROOT)) for path in skipped]
+        if skipped:
+            print(f"Skipping {len(skipped)} fixture(s) with no known text (no sentences.json entry next to them): "
+                  + ", ".join(report['skipped_fixtures']))
+        if fixtures:
+            datasets['fixtures'] = fixtures
+        if args.synthetic:
+            datasets['synthetic'] = synthetic_files(Path(work_dir) / "synthetic_input", args.synthetic,
+                                                    args.words_per_file)
+        for name, files in datasets.items():
+            report['datasets'][name] = run_dataset(name, files, args, work_dir)
+            print_dataset(name, report['datasets'][name])
+
+    report['peak_rss_mb'] = _peak_rss_mb(resource.RUSAGE_SELF) if resource else None
+    report['peak_child_rss_mb'] = _peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None
+    if report['peak_rss_mb'] is not None:
+        print(f"\nPeak RSS: {report['peak_rss_mb']:.0f} MB (largest ffmpeg child {report['peak_child_rss_mb']:.0f} MB)")
+
+    output = args.output or RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to: {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
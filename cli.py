@@ -0,0 +1,160 @@
+import sys
+import argparse
+import subprocess
+from pathlib import Path
+
+# Only the standard library is imported up front; each subcommand imports the modules
+# (and with them pydub, edge_tts, vosk, numpy, ...) it actually needs.
+
+# Modules that importing the CLI or a subcommand's module must not pull in; they are
+# imported by the functions that use them
+HEAVY_MODULES = ["pandas", "numpy", "pydub", "edge_tts", "vosk", "mutagen", "aiohttp", "openpyxl"]
+# The CLI and the modules its subcommands import before doing any work
+STARTUP_MODULES = ["cli", "main", "wta", "aToWVosk"]
+# Cumulative import time allowed for each of them, in milliseconds
+IMPORT_BUDGET_MS = 100
+
+
+def synthesize(args):
+    import asyncio
+    import main
+    if args.split_mode:
+        main.WORD_SPLIT_MODE = args.split_mode
+    asyncio.run(main.process_my_sentences())
+
+
+def words(args):
+    import asyncio
+    import wta
+    asyncio.run(wta.synthesize_all(
+        excel_path=args.excel or wta.EXCEL_PATH,
+        output_dir=args.output or wta.OUTPUT_DIR,
+        cache=not args.no_cache,
+        concurrency=args.concurrency or wta.CONCURRENCY,
+        save_every_rows=args.save_every or wta.SAVE_EVERY_ROWS,
+    ))
+
+
+def align(args):
+    import aToWVosk
+    aToWVosk.process_audio_folder(
+        resume=args.resume,
+        input_dir=args.input_dir or aToWVosk.INPUT_DIR,
+        output_dir=args.output_dir or aToWVosk.OUTPUT_DIR,
+        workers=args.workers,
+        dry_run=args.dry_run,
+    )
+
+
+def split(args):
+    import aToWVosk
+    output_dir = Path(args.output)
+    splitter = aToWVosk.AudioSplitter(
+        output_dir=str(output_dir),
+        model_path=None if args.energy else args.model,
+        frame_cut=args.frame_cut,
+        use_grammar=not args.no_grammar,
+        energy_fallback=args.energy,
+    )
+    result = splitter.split_audio_file(args.audio, args.text, args.ordinal)
+    if result is None:
+        return 1
+    print(f"Created {len(result['word_files'])} word files in {output_dir}")
+    splitter.save_excel(output_dir / "word_data.xlsx")
+    splitter.save_mismatches(output_dir / "text_mismatches.json")
+
+
+def import_times(module="cli"):
+    """{module: cumulative µs} for everything importing module loads, in a fresh interpreter (-X importtime).
+
+    Modules the interpreter had already imported at startup (site, ...) aren't counted.
+    """
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                             cwd=Path(__file__).resolve().parent, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{process.stderr}")
+    times = {}
+    pending = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        pending[name.strip()] = int(cumulative)
+        # Nested imports are indented and listed before the top-level import that caused them
+        if not name.startswith("  "):
+            if name.strip() == module:
+                times = pending
+            pending = {}
+    return times
+
+
+def check_imports(args):
+    """Fail when importing the CLI or a subcommand's module loads a heavy dependency or exceeds the budget"""
+    failed = False
+    for module in STARTUP_MODULES:
+        # Best of a few fresh interpreters, as one run is easily slowed by the rest of the machine
+        times = min((import_times(module) for _ in range(args.repeat)), key=lambda t: t[module])
+        total_ms = times[module] / 1000
+        heavy = [name for name in HEAVY_MODULES if name in times]
+        print(f"import {module}: {total_ms:.1f} ms (budget {args.budget} ms)")
+        for name, cumulative in sorted(times.items(), key=lambda item: -item[1])[1:args.top + 1]:
+            print(f"  {cumulative / 1000:8.1f} ms  {name}")
+        if heavy:
+            print(f"  Heavy modules imported at startup: {', '.join(heavy)}")
+        failed = failed or bool(heavy) or total_ms > args.budget
+    if failed:
+        return 1
+    print("OK")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Text-to-speech and word-splitting pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("synthesize", help="synthesize the sentences (main.py)")
+    p.add_argument("--split-mode", choices=["vosk", "boundaries"],
+                   help="how word clips are made afterwards (default: main.WORD_SPLIT_MODE)")
+    p.set_defaults(handler=synthesize)
+
+    p = commands.add_parser("words", help="synthesize the words sheet and write file names back (wta.py)")
+    p.add_argument("--excel", type=Path, help="workbook with the words sheet (default: wta.EXCEL_PATH)")
+    p.add_argument("--output", type=Path, help="folder for the MED6X files (default: wta.OUTPUT_DIR)")
+    p.add_argument("--concurrency", type=int, help="words in flight at once; 1 for the sequential loop")
+    p.add_argument("--save-every", type=int, help="save the workbook after this many rows")
+    p.add_argument("--no-cache", action="store_true", help="don't use the synthesis cache")
+    p.set_defaults(handler=words)
+
+    p = commands.add_parser("align", help="split a folder of sentence recordings into word clips (aToWVosk.py)")
+    p.add_argument("--input-dir", type=Path, help="folder of ENGB1*.mp3 files (default: aToWVosk.INPUT_DIR)")
+    p.add_argument("--output-dir", type=Path, help="folder for the word clips (default: aToWVosk.OUTPUT_DIR)")
+    p.add_argument("--workers", type=int, help="worker processes (default: aToWVosk.WORKERS)")
+    p.add_argument("--resume", action="store_true", help="continue from the input folder's checkpoint.json")
+    p.add_argument("--dry-run", action="store_true", help="check the inputs and model without loading it")
+    p.set_defaults(handler=align)
+
+    p = commands.add_parser("split", help="split one recording into word clips")
+    p.add_argument("audio", help="mp3 file")
+    p.add_argument("text", help="the sentence spoken in it")
+    p.add_argument("--output", default="audio_output", help="folder for the word clips")
+    p.add_argument("--ordinal", type=int, default=1, help="sentence number recorded in word_data")
+    p.add_argument("--model", default=str(Path(__file__).resolve().parent / "model"), help="Vosk model folder")
+    p.add_argument("--energy", action="store_true", help="time words from silences instead of loading a model")
+    p.add_argument("--frame-cut", action="store_true", help="cut clips on mp3 frames instead of re-encoding")
+    p.add_argument("--no-grammar", action="store_true", help="recognize with the model's full vocabulary")
+    p.set_defaults(handler=split)
+
+    p = commands.add_parser("check-imports", help="check that starting the CLI and its subcommands stays cheap")
+    p.add_argument("--budget", type=float, default=IMPORT_BUDGET_MS, help="allowed import time in ms")
+    p.add_argument("--top", type=int, default=5, help="slowest imports to list")
+    p.add_argument("--repeat", type=int, default=3, help="imports timed per module; the fastest counts")
+    p.set_defaults(handler=check_imports)
+    return parser
+
+
+def run(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,85 @@
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Raw PCM formats ffmpeg reads on stdin, by pydub sample width
+PCM_FORMATS = {1: "u8", 2: "s16le", 3: "s24le", 4: "s32le"}
+
+
+class ClipExporter:
+    """Encodes many short AudioSegment clips to mp3 with few ffmpeg processes.
+
+    Clips are queued with add() and written by flush(): clips with the same
+    sample format go to one ffmpeg run (up to max_clips each) that reads their
+    PCM back to back on stdin and cuts it apart again with atrim, one output
+    file per clip. Runs for different groups go through a pool of `workers`
+    threads. The files come out as AudioSegment.export(path, format="mp3")
+    would write them.
+    """
+
+    def __init__(self, max_clips=64, workers=2, bitrate=None):
+        self.max_clips = max_clips
+        self.workers = workers
+        self.bitrate = bitrate
+        self.pending = []
+
+    def add(self, audio, path):
+        self.pending.append((audio, Path(path)))
+
+    def flush(self):
+        """Write every queued clip; returns their paths in the order they were added"""
+        pending, self.pending = self.pending, []
+        if not pending:
+            return []
+
+        groups = {}
+        for audio, path in pending:
+            if len(audio.raw_data) == 0:
+                # Nothing for atrim to cut; let pydub write the empty file
+                audio.export(str(path), format="mp3")
+                continue
+            key = (audio.frame_rate, audio.channels, audio.sample_width)
+            groups.setdefault(key, []).append((audio, path))
+
+        batches = [clips[i:i + self.max_clips] for clips in groups.values()
+                   for i in range(0, len(clips), self.max_clips)]
+        if len(batches) == 1 or self.workers <= 1:
+            for batch in batches:
+                self._encode(batch)
+        else:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                list(pool.map(self._encode, batches))
+        return [path for _, path in pending]
+
+    def _encode(self, clips):
+        from pydub import AudioSegment
+        from pydub.exceptions import CouldntEncodeError
+        first = clips[0][0]
+        command = [
+            AudioSegment.converter, "-y", "-hide_banner", "-loglevel", "error",
+            "-f", PCM_FORMATS[first.sample_width], "-ar", str(first.frame_rate), "-ac", str(first.channels),
+            "-i", "pipe:0",
+        ]
+
+        filters = [f"[0:a]asplit={len(clips)}" + "".join(f"[s{i}]" for i in range(len(clips)))]
+        position = 0
+        for i, (audio, _) in enumerate(clips):
+            frames = int(audio.frame_count())
+            filters.append(f"[s{i}]atrim=start_sample={position}:end_sample={position + frames},"
+                           f"asetpts=PTS-STARTPTS[o{i}]")
+            position += frames
+        command += ["-filter_complex", ";".join(filters)]
+
+        for i, (_, path) in enumerate(clips):
+            command += ["-map", f"[o{i}]", "-f", "mp3"]
+            if self.bitrate:
+                command += ["-b:a", self.bitrate]
+            command.append(str(path))
+
+        process = subprocess.run(command, input=b"".join(audio.raw_data for audio, _ in clips),
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if process.returncode != 0:
+            raise CouldntEncodeError(
+                f"Encoding {len(clips)} clips failed (ffmpeg exit code {process.returncode}):\n"
+                f"{process.stderr.decode(errors='replace')}"
+            )
@@ -1,8 +1,13 @@
 import os
+import sys
 from pathlib import Path
 import shutil
 from pydub import AudioSegment
-from pydub.silence import split_on_silence
+
+# Shared helpers (clipExport, silenceSplit) live in the project root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from clipExport import ClipExporter
+from silenceSplit import split_on_silence
 
 class AudioSplitter:
     def __init__(self, output_dir="audio_output"):
@@ -40,15 +45,19 @@ class AudioSplitter:
             word_files = []
             
             # Save the original file
+            exporter = ClipExporter()
             original_filename = self.output_dir / f"original_{self.clean_filename(text)[:30]}.mp3"
-            audio.export(str(original_filename), format="mp3")
+            exporter.add(audio, original_filename)
             word_files.append(original_filename)
             
             # Save individual word chunks
             for i, (chunk, word) in enumerate(zip(chunks, words)):
                 filename = self.output_dir / f"{output_prefix}_{i}_{self.clean_filename(word)}.mp3"
-                chunk.export(str(filename), format="mp3")
+                exporter.add(chunk, filename)
                 word_files.append(filename)
+
+            # One ffmpeg run encodes the original and all chunks
+            exporter.flush()
             
             return {
                 'original_file': original_filename,
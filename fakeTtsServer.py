@@ -0,0 +1,222 @@
+import re
+import json
+import uuid
+import random
+import asyncio
+import argparse
+from xml.sax.saxutils import unescape
+
+from aiohttp import web, WSMsgType
+
+from mp3Frames import silent_frame
+from ttsPool import TICKS_PER_SECOND, _timestamp, _split_message
+
+# MPEG-2 Layer III, 48 kbps, 24 kHz, mono - the stream Edge TTS sends for OUTPUT_FORMAT
+FRAME_HEADER = b"\xff\xf3\x64\xc4"
+FRAME_MS = 24
+# Path the load test points edge_tts / EdgeConnectionPool at; the query string lets
+# edge_tts append its own &Sec-MS-GEC=... parameters
+ENDPOINT_PATH = "/consumer/speech/synthesize/readaloud/edge/v1"
+
+
+class LatencyModel:
+    """Server-side delay before the first audio chunk of each request.
+
+    "fixed" always waits median_ms; "uniform" draws from 0..2 * median_ms;
+    "lognormal" has the given median and a long right tail set by sigma, which is
+    closest to what the live service does under load.
+    """
+
+    def __init__(self, median_ms=150, distribution="lognormal", sigma=0.6, rng=None):
+        self.median_ms = median_ms
+        self.distribution = distribution
+        self.sigma = sigma
+        self.rng = rng or random.Random()
+
+    def sample(self):
+        """One delay in seconds"""
+        if self.distribution == "fixed":
+            ms = self.median_ms
+        elif self.distribution == "uniform":
+            ms = self.rng.uniform(0, 2 * self.median_ms)
+        elif self.distribution == "lognormal":
+            ms = self.median_ms * self.rng.lognormvariate(0, self.sigma)
+        else:
+            raise ValueError(f"Unknown latency distribution: {self.distribution}")
+        return ms / 1000
+
+
+class FakeTtsServer:
+    """Local stand-in for the Edge read-aloud websocket service.
+
+    Speaks the same protocol as the real service closely enough for both
+    edge_tts.Communicate and ttsPool.EdgeConnection: speech.config and ssml in,
+    turn.start, audio.metadata (one WordBoundary per word, when enabled), binary
+    audio chunks and turn.end out. The audio is valid mp3 made of silent frames,
+    about ms_per_char long per character, with word boundaries spread over it.
+
+    Faults are injected at random: error_rate drops the connection in the middle
+    of a reply, throttle_rate answers the websocket handshake with 429, and more
+    than max_connections open sockets also get 429.
+    """
+
+    def __init__(self, latency=None, error_rate=0.0, throttle_rate=0.0, max_connections=None,
+                 ms_per_char=65, chunk_frames=20, seed=None):
+        self.rng = random.Random(seed)
+        self.latency = latency or LatencyModel(rng=self.rng)
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_connections = max_connections
+        self.ms_per_char = ms_per_char
+        self.chunk_frames = chunk_frames
+        self.connections = 0
+        self.stats = {'connections': 0, 'requests': 0, 'throttled': 0, 'dropped': 0, 'audio_bytes': 0}
+        self._runner = None
+        self.url = None
+
+    def _timeline(self, text):
+        """Word boundaries (offsets in ticks) and frame count for the fake audio of text"""
+        boundaries = []
+        position_ms = 100  # the service starts every reply with a short silence
+        for word in re.findall(r"\w+", text):
+            duration_ms = max(FRAME_MS, len(word) * self.ms_per_char)
+            boundaries.append({
+                'Offset': position_ms * TICKS_PER_SECOND // 1000,
+                'Duration': duration_ms * TICKS_PER_SECOND // 1000,
+                'text': {'Text': word, 'Length': len(word), 'BoundaryType': "WordBoundary"},
+            })
+            position_ms += duration_ms + self.ms_per_char  # a character's worth of pause between words
+        return boundaries, max(1, round((position_ms + 100) / FRAME_MS))
+
+    async def _send_text(self, ws, request_id, path, body=""):
+        await ws.send_str(
+            f"X-RequestId:{request_id}\r\n"
+            "Content-Type:application/json; charset=utf-8\r\n"
+            f"X-Timestamp:{_timestamp()}Z\r\n"
+            f"Path:{path}\r\n\r\n"
+            f"{body}"
+        )
+
+    async def _send_audio(self, ws, request_id, data):
+        header = f"X-RequestId:{request_id}\r\nContent-Type:audio/mpeg\r\nPath:audio\r\n".encode("utf-8")
+        await ws.send_bytes(len(header).to_bytes(2, "big") + header + data)
+
+    async def _reply(self, ws, ssml, word_boundaries):
+        match = re.search(r"<prosody[^>]*>(.*)</prosody>", ssml, re.S)
+        text = unescape(match.group(1)) if match else ""
+        request_id = uuid.uuid4().hex
+        boundaries, frame_count = self._timeline(text)
+        self.stats['requests'] += 1
+
+        await asyncio.sleep(self.latency.sample())
+        await self._send_text(ws, request_id, "turn.start", json.dumps({"context": {"serviceTag": request_id}}))
+
+        drop_at = frame_count // 2 if self.rng.random() < self.error_rate else None
+        if word_boundaries:
+            for boundary in boundaries:
+                await self._send_text(ws, request_id, "audio.metadata", json.dumps(
+                    {"Metadata": [{"Type": "WordBoundary", "Data": boundary}]}))
+
+        frame = silent_frame(FRAME_HEADER)
+        for first in range(0, frame_count, self.chunk_frames):
+            if drop_at is not None and first >= drop_at:
+                self.stats['dropped'] += 1
+                await ws.close(code=1011, message=b"injected failure")
+                return False
+            chunk = frame * min(self.chunk_frames, frame_count - first)
+            await self._send_audio(ws, request_id, chunk)
+            self.stats['audio_bytes'] += len(chunk)
+
+        await self._send_text(ws, request_id, "turn.end", "{}")
+        return True
+
+    async def handle(self, request):
+        if (self.max_connections is not None and self.connections >= self.max_connections) \
+                or self.rng.random() < self.throttle_rate:
+            self.stats['throttled'] += 1
+            return web.Response(status=429, text="Too Many Requests")
+
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        self.stats['connections'] += 1
+        word_boundaries = False
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                headers, body = _split_message(message.data.encode("utf-8"))
+                path = headers.get(b"Path")
+                if path == b"speech.config":
+                    options = json.loads(body)["context"]["synthesis"]["audio"]["metadataoptions"]
+                    word_boundaries = options.get("wordBoundaryEnabled") == "true"
+                elif path == b"ssml":
+                    if not await self._reply(ws, body.decode("utf-8"), word_boundaries):
+                        break
+        finally:
+            self.connections -= 1
+        return ws
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Serve in the running event loop; returns the endpoint URL to hand to clients"""
+        app = web.Application()
+        app.router.add_get(ENDPOINT_PATH, self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"ws://{host}:{port}{ENDPOINT_PATH}?TrustedClientToken=fake"
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def add_server_arguments(parser):
+    """Fault and latency options shared by this script and loadTest.py"""
+    parser.add_argument("--latency-ms", type=float, default=150, help="median delay before a reply starts")
+    parser.add_argument("--latency", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-sigma", type=float, default=0.6, help="spread of the lognormal latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of replies cut off mid-stream")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of handshakes answered with 429")
+    parser.add_argument("--max-connections", type=int, default=None, help="answer 429 above this many open sockets")
+    parser.add_argument("--ms-per-char", type=float, default=65, help="length of the fake audio per character")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def server_from_arguments(args):
+    rng = random.Random(args.seed)
+    return FakeTtsServer(
+        latency=LatencyModel(args.latency_ms, args.latency, args.latency_sigma, rng=rng),
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        max_connections=args.max_connections,
+        ms_per_char=args.ms_per_char,
+        seed=args.seed,
+    )
+
+
+async def serve(args):
+    server = server_from_arguments(args)
+    url = await server.start(args.host, args.port)
+    print(f"Fake TTS service listening on {url}")
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await server.stop()
+        print(f"Served: {server.stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Edge TTS websocket service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_server_arguments(parser)
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,185 @@
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import edge_tts.communicate
+from openpyxl import Workbook
+
+import ttsStream
+import wta
+from main import AudioSplitter
+from ttsPool import EdgeConnectionPool
+from fakeTtsServer import add_server_arguments, server_from_arguments
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of values (p in 0..100)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, round(p / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+@contextmanager
+def timed_requests(latencies, errors):
+    """Record the duration of every synthesis request (pooled or direct) while active"""
+    original = ttsStream._stream
+
+    async def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = await original(*args, **kwargs)
+        except Exception:
+            errors.append(time.perf_counter() - started)
+            raise
+        latencies.append(time.perf_counter() - started)
+        return result
+
+    ttsStream._stream = timed
+    try:
+        yield
+    finally:
+        ttsStream._stream = original
+
+
+@contextmanager
+def direct_endpoint(url):
+    """Point edge_tts.Communicate at url instead of the live service"""
+    original = edge_tts.communicate.WSS_URL
+    edge_tts.communicate.WSS_URL = url
+    try:
+        yield
+    finally:
+        edge_tts.communicate.WSS_URL = original
+
+
+def sample_sentences(count):
+    """count sentences in main.py's input shape, cycling through sentences.json"""
+    with open(Path(__file__).resolve().parent / "sentences.json", 'r', encoding='utf-8') as f:
+        texts = json.load(f)['sentences']
+    sentences = []
+    for i in range(count):
+        # Numbered so no two requests share a text, whatever caching or dedup is in place
+        text = f"{texts[i % len(texts)]} {i + 1}"
+        if " - " in text:
+            sentences.append({'s': text, 'd': [101, 102]})
+        else:
+            sentences.append({'s': text, 'd': [101 + i % 2]})
+    return sentences
+
+
+def write_word_sheet(path, count):
+    """A wta.py-style workbook with count word rows and no audio file names yet"""
+    words = sorted({w.strip("?!.,") for s in sample_sentences(count) for w in s['s'].split()} - {""})
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "words"
+    ws.append(["words", "dubbers"])
+    for i in range(count):
+        ws.append([f"{words[i % len(words)]} {i + 1}", 101 + i % 2])
+    wb.save(path)
+
+
+async def run_sentences(args, pool, work_dir):
+    splitter = AudioSplitter(output_dir=work_dir, voice="ka-GE-EkaNeural", concurrency=args.concurrency,
+                             capture_boundaries=args.boundaries, pool=pool)
+    await splitter.process_multiple_sentences(sample_sentences(args.count))
+    return {
+        'failed_items': len(splitter.failures),
+        'retried_requests': sum(splitter.resilience.retried.values()),
+        'final_concurrency_limit': splitter.resilience.limiter.limit,
+    }
+
+
+async def run_wta(args, pool, work_dir):
+    excel_path = Path(work_dir) / "words.xlsx"
+    write_word_sheet(excel_path, args.count)
+    await wta.synthesize_all(excel_path=excel_path, output_dir=Path(work_dir) / "words", pool=pool, cache=False,
+                             concurrency=args.concurrency)
+    return {}
+
+
+async def load_test(args):
+    server = None
+    url = args.endpoint
+    if url is None:
+        server = server_from_arguments(args)
+        url = await server.start()
+    pool = None if args.no_pool else EdgeConnectionPool(size=args.pool_size, endpoint=url)
+
+    latencies = []
+    errors = []
+    scenario = run_wta if args.scenario == "wta" else run_sentences
+    try:
+        with tempfile.TemporaryDirectory() as work_dir, direct_endpoint(url), timed_requests(latencies, errors):
+            started = time.perf_counter()
+            details = await scenario(args, pool, work_dir)
+            wall = time.perf_counter() - started
+    finally:
+        if pool is not None:
+            await pool.close()
+        if server is not None:
+            await server.stop()
+
+    report = {
+        'scenario': args.scenario,
+        'items': args.count,
+        'pooled': pool is not None,
+        'wall_seconds': wall,
+        'items_per_second': args.count / wall if wall else None,
+        'requests': len(latencies),
+        'failed_requests': len(errors),
+        'requests_per_second': len(latencies) / wall if wall else None,
+        'latency_ms': {
+            name: (percentile(latencies, p) * 1000 if latencies else None)
+            for name, p in (('p50', 50), ('p95', 95), ('p99', 99), ('max', 100))
+        },
+        **details,
+    }
+    if pool is not None:
+        report['pool_reconnects'] = pool.reconnects
+    if server is not None:
+        report['server'] = dict(server.stats)
+    return report
+
+
+def print_report(report):
+    latency = report['latency_ms']
+    print(f"\n{report['scenario']}: {report['items']} items in {report['wall_seconds']:.2f}s "
+          f"({report['items_per_second']:.1f} items/s, {report['requests_per_second']:.1f} requests/s, "
+          f"{'pooled' if report['pooled'] else 'direct'} connections)")
+    if report['requests']:
+        print(f"Request latency: p50 {latency['p50']:.0f} ms, p95 {latency['p95']:.0f} ms, "
+              f"p99 {latency['p99']:.0f} ms, max {latency['max']:.0f} ms")
+    print(f"{report['requests']} requests succeeded, {report['failed_requests']} failed attempts")
+    for key in ('failed_items', 'retried_requests', 'final_concurrency_limit', 'pool_reconnects', 'server'):
+        if key in report:
+            print(f"  {key}: {report[key]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Drive the synthesis pipeline against the local fake TTS service and report throughput")
+    parser.add_argument("scenario", choices=["sentences", "wta"],
+                        help="AudioSplitter.process_multiple_sentences or wta.synthesize_all")
+    parser.add_argument("--count", type=int, default=200, help="sentences (or word rows) to synthesize")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--no-pool", action="store_true", help="one connection per request through edge_tts")
+    parser.add_argument("--boundaries", action="store_true", help="request word boundaries too")
+    parser.add_argument("--endpoint", default=None,
+                        help="use an already running fakeTtsServer.py instead of starting one")
+    parser.add_argument("--json", type=Path, default=None, help="also write the report to this file")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    report = asyncio.run(load_test(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
@@ -1,27 +1,60 @@
 import os
+import io
 from pathlib import Path
 import shutil
 import asyncio
-import edge_tts
-from pydub import AudioSegment
-from pydub.silence import split_on_silence
-import json
 import subprocess
-import pandas as pd
-import re
-import time
+from mp3Frames import join_mp3
+from ttsStream import synthesize_to_buffer, synthesize_with_boundaries, write_audio_file
+from synthCache import SynthesisCache, normalize_text, link_or_copy
+from runManifest import RunManifest
+from ttsRetry import ResilientCaller
+from sentenceSource import open_sentences
+from voiceCatalog import catalog, load_dubbers
+
+# How word clips are made after synthesis:
+#   "vosk"       - run aToWVosk.py (speech recognition) over the output folder
+#   "boundaries" - cut words directly from the TTS word-boundary events, no Vosk model needed
+WORD_SPLIT_MODE = "vosk"
+# Skip sentences the output folder's manifest.jsonl records as already synthesized
+RESUME = True
 
 class AudioSplitter:
-    def __init__(self, output_dir="audio_output", voice="ka-GE-EkaNeura"):
+    def __init__(self, output_dir="audio_output", voice=None, concurrency=1, keep_audio=False,
+                 capture_boundaries=False, rate="+0%", cache=None, manifest=None, resume=False, resilience=None,
+                 pool=None):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
-        self.voice = voice
+        self.rate = rate
+        # Optional SynthesisCache; unchanged text/voice pairs are then served from disk
+        self.cache = cache
+        # Optional RunManifest of finished sentences; with resume=True valid entries are skipped
+        self.manifest = manifest
+        self.resume = resume
+        # Number of sentences synthesized at the same time by process_multiple_sentences
+        self.concurrency = concurrency
+        # Optional ttsPool.EdgeConnectionPool; requests then reuse open connections
+        self.pool = pool
+        # Retries with backoff and an adaptive (AIMD) limit on requests in flight
+        self.resilience = resilience or ResilientCaller(max_concurrency=max(1, concurrency))
+        # Request all parts of a dialogue sentence at once and join them in memory
+        self.parallel_parts = True
+        # Synthesize a repeated text/voice pair once per run and link its file for the repeats
+        self.deduplicate = True
+        self._unique = {}
+        self.duplicates = 0
+        # Keep each sentence's mp3 bytes in its result so alignment can skip re-reading the file
+        self.keep_audio = keep_audio
+        self.audio_buffers = {}
+        # Record TTS word-boundary timings so words can be cut without Vosk (aToWVosk.split_from_synthesis)
+        self.capture_boundaries = capture_boundaries
+        self.word_boundaries = {}
+        self.failures = []
         # Map numeric dubber IDs to Edge TTS short voice names
-        # Extend this mapping as needed
-        self.voice_map = {
-            101: "ka-GE-GiorgiNeural",
-            102: "ka-GE-EkaNeural",
-        }
+        # Extend config/dubbers.json as needed
+        self.voice_map, default_voice = load_dubbers()
+        # Voice for sentences without dubbers; config/dubbers.json's default unless given
+        self.voice = voice or default_voice
     
     def clean_filename(self, text):
         """Create a safe filename from text"""
@@ -33,22 +66,89 @@ class AudioSplitter:
         filename = self.output_dir / f"{formatted_id}.mp3"
         
         print(f"Creating audio file for sentence: {text}")
-        
+        return await self.create_audio_file(text, filename, sentence_id, voice_override)
+
+    async def create_audio_file(self, text, filename, sentence_id, voice_override=None):
+        """Synthesize text (or fetch it from the cache) straight into filename"""
         voice_to_use = voice_override if voice_override else self.voice
-        communicate = edge_tts.Communicate(text, voice_to_use)
-        # communicate = edge_tts.Communicate(text, self.voice, rate='-10%')
-        await communicate.save(str(filename))
+        if self._fetch_cached(text, voice_to_use, filename, sentence_id):
+            return filename
+
+        data, boundaries = await self._synthesize(text, voice_to_use)
+        write_audio_file(filename, data)
+        self._keep_sentence_data(sentence_id, data, boundaries)
         
         return filename
 
+    def _fetch_cached(self, text, voice_name, filename, sentence_id):
+        """Hardlink/copy a cached sentence into place; False when it has to be synthesized."""
+        if self.cache is None or self.keep_audio:
+            return False
+        key = self.cache.make_key(text, voice_name, self.rate)
+        if not self.cache.has(key):
+            return False
+        boundaries = None
+        if self.capture_boundaries:
+            boundaries = self.cache.boundaries(key)
+            if boundaries is None:
+                return False
+        if not self.cache.fetch(key, filename):
+            return False
+        print(f"Served from cache: {filename.name}")
+        self._keep_sentence_data(sentence_id, None, boundaries)
+        return True
+
+    def _keep_sentence_data(self, sentence_id, data, boundaries):
+        """Hold on to the audio and word timings that process_sentence hands back."""
+        if self.keep_audio:
+            self.audio_buffers[sentence_id] = data
+        if self.capture_boundaries:
+            self.word_boundaries[sentence_id] = boundaries
+
+    def _resolve_voices(self, sentence_text, dubbers):
+        """Voices process_sentence will use: one per dialogue part for multi-voice sentences."""
+        if isinstance(dubbers, list) and len(dubbers) > 0:
+            if " - " in sentence_text and len(dubbers) == len(sentence_text.split(" - ")):
+                return [self._voice_for_id(dubber_id) for dubber_id in dubbers]
+            return [self._voice_for_id(dubbers[0])]
+        return [self.voice]
+
+    def validate_voices(self):
+        """Raise before any request if the default voice or a dubber's voice isn't a known Edge TTS voice."""
+        catalog().validate([self.voice, *self.voice_map.values()])
+
     def _voice_for_id(self, dubber_id):
         """Return edge-tts short voice name for a numeric dubber id, fallback to default voice."""
         return self.voice_map.get(dubber_id, self.voice)
 
     async def _synthesize_to_file(self, text, voice_name, out_path):
         """Synthesize given text with specified voice to an mp3 file."""
-        communicate = edge_tts.Communicate(text, voice_name)
-        await communicate.save(str(out_path))
+        write_audio_file(out_path, await self._synthesize_to_bytes(text, voice_name))
+
+    async def _synthesize_to_bytes(self, text, voice_name):
+        """Synthesize given text with specified voice and return the mp3 bytes."""
+        data, _ = await self._synthesize(text, voice_name)
+        return data
+
+    async def _synthesize(self, text, voice_name):
+        """Synthesize text and return (mp3 bytes, word boundaries); boundaries are empty unless captured."""
+        key = None
+        if self.cache is not None:
+            key = self.cache.make_key(text, voice_name, self.rate)
+            cached = self.cache.load(key, with_boundaries=self.capture_boundaries)
+            if cached is not None:
+                return cached
+
+        async def request():
+            if self.capture_boundaries:
+                return await synthesize_with_boundaries(text, voice_name, rate=self.rate, pool=self.pool)
+            return await synthesize_to_buffer(text, voice_name, rate=self.rate, pool=self.pool), []
+
+        data, boundaries = await self.resilience.call(text, request)
+
+        if key is not None:
+            self.cache.store(key, data, boundaries if self.capture_boundaries else None)
+        return data, boundaries
 
     async def create_multivoice_sentence_audio(self, text, dubbers, sentence_id):
         """Create audio file for a sentence with multiple segments/voices based on dubbers list."""
@@ -63,6 +163,13 @@ class AudioSplitter:
 
         print(f"Creating multi-voice audio for sentence id {sentence_id}: {len(parts)} parts")
 
+        if self.parallel_parts:
+            voices = [self._voice_for_id(dubber_id) for dubber_id in dubbers]
+            data, boundaries = await self._create_multivoice_in_memory(parts, voices)
+            write_audio_file(final_filename, data)
+            self._keep_sentence_data(sentence_id, data, boundaries)
+            return final_filename
+
         temp_files = []
         try:
             # Synthesize each part with its corresponding voice
@@ -72,18 +179,13 @@ class AudioSplitter:
                 await self._synthesize_to_file(part_text, voice_name, tmp_path)
                 temp_files.append(tmp_path)
 
-            # Concatenate parts
-            combined = None
-            for tmp in temp_files:
-                seg = AudioSegment.from_file(tmp)
-                if combined is None:
-                    combined = seg
-                else:
-                    combined = combined + seg
-
-            if combined is None:
+            if not temp_files:
                 raise Exception("No audio segments generated for multi-voice synthesis")
 
+            # Concatenate parts (one allocation for the joined samples)
+            from pydub import AudioSegment
+            from pcmBuffer import join_segments
+            combined, _ = join_segments([AudioSegment.from_file(tmp) for tmp in temp_files])
             combined.export(str(final_filename), format="mp3")
             return final_filename
         finally:
@@ -94,56 +196,186 @@ class AudioSplitter:
                 except Exception:
                     pass
 
+    async def _create_multivoice_in_memory(self, parts, voices):
+        """Synthesize all dialogue parts concurrently and return the joined mp3 bytes and word boundaries."""
+        synthesized = await asyncio.gather(*(
+            self._synthesize(part_text, voice_name)
+            for part_text, voice_name in zip(parts, voices)
+        ))
+
+        if not synthesized:
+            raise Exception("No audio segments generated for multi-voice synthesis")
+
+        try:
+            # Same-format parts are joined frame by frame, with no decode or re-encode
+            data, part_starts = join_mp3([part_data for part_data, _ in synthesized])
+        except ValueError as e:
+            print(f"Frame join not possible ({e}); re-encoding parts")
+            data, part_starts = self._join_reencoded([part_data for part_data, _ in synthesized])
+
+        # Shift each part's word timings by the length of the parts before it
+        boundaries = []
+        for part_start, (_, part_boundaries) in zip(part_starts, synthesized):
+            part_start /= 1000
+            for b in part_boundaries:
+                boundaries.append({'word': b['word'], 'start': b['start'] + part_start, 'end': b['end'] + part_start})
+
+        return data, boundaries
+
+    def _join_reencoded(self, buffers):
+        """Decode mp3 parts, join them and encode once; returns (bytes, part start times in ms)."""
+        # pydub and NumPy are only needed here, not by the frame-joining path or to import main
+        from pydub import AudioSegment
+        from pcmBuffer import join_segments
+        segments = [AudioSegment.from_file(io.BytesIO(data), format="mp3") for data in buffers]
+        combined, part_starts = join_segments(segments)
+
+        output = io.BytesIO()
+        combined.export(output, format="mp3")
+        return output.getvalue(), part_starts
+
     async def process_sentence(self, text, sentence_id=1):
+        # Support both plain strings and objects with keys 's' and optional 'd'
+        if isinstance(text, dict):
+            sentence_text = text.get('s', '')
+            dubbers = text.get('d')
+        else:
+            sentence_text = text
+            dubbers = None
+
+        shared = None
         try:
-            # Support both plain strings and objects with keys 's' and optional 'd'
-            if isinstance(text, dict):
-                sentence_text = text.get('s', '')
-                dubbers = text.get('d')
-            else:
-                sentence_text = text
-                dubbers = None
+            voice_key = "|".join(self._resolve_voices(sentence_text, dubbers))
+            if self.manifest is not None and self.resume:
+                entry = self.manifest.completed(sentence_id, sentence_text, voice_key, self.rate)
+                if entry is not None:
+                    print(f"Already done, skipping: {sentence_text}")
+                    result = {
+                        'id': sentence_id,
+                        'sentence_file': Path(entry['path']),
+                        'text': sentence_text,
+                        'skipped': True
+                    }
+                    if self.keep_audio:
+                        result['audio'] = None
+                    if self.capture_boundaries:
+                        result['boundaries'] = entry.get('boundaries', [])
+                    return result
 
             print(f"Processing sentence: {sentence_text}")
 
-            # Choose synthesis path based on provided dubbers and text segmentation
-            if isinstance(dubbers, list) and len(dubbers) > 0:
-                if " - " in sentence_text:
-                    parts = sentence_text.split(" - ")
-                    if len(dubbers) == len(parts):
-                        sentence_file = await self.create_multivoice_sentence_audio(sentence_text, dubbers, sentence_id)
-                    else:
-                        print(f"Dubber/part count mismatch (dubbers={len(dubbers)}, parts={len(parts)}); using first dubber id {dubbers[0]}")
-                        voice_name = self._voice_for_id(dubbers[0])
-                        sentence_file = await self.create_sentence_audio(sentence_text, sentence_id, voice_override=voice_name)
-                else:
-                    # No segmentation in text; honor the first dubber id
-                    voice_name = self._voice_for_id(dubbers[0])
-                    print(f"No parts separator in text; using first dubber id {dubbers[0]} -> {voice_name}")
-                    sentence_file = await self.create_sentence_audio(sentence_text, sentence_id, voice_override=voice_name)
-            else:
-                sentence_file = await self.create_sentence_audio(sentence_text, sentence_id)
-            print(f"Created sentence audio: {sentence_file}")
+            sentence_file = None
+            dedup_key = (normalize_text(sentence_text), voice_key)
+            if self.deduplicate and dedup_key in self._unique:
+                # Same text and voices as an earlier sentence: wait for it and link its file
+                original = await asyncio.shield(self._unique[dedup_key])
+                if original is not None:
+                    sentence_file = link_or_copy(original['sentence_file'],
+                                                 self.output_dir / f"MED8{sentence_id:06d}.mp3")
+                    self._keep_sentence_data(sentence_id, original.get('audio'), original.get('boundaries'))
+                    self.duplicates += 1
+                    print(f"Same as MED8{original['id']:06d}, linked: {sentence_file}")
+            if sentence_file is None:
+                if self.deduplicate:
+                    shared = asyncio.get_running_loop().create_future()
+                    self._unique[dedup_key] = shared
+                sentence_file = await self._create_sentence_file(sentence_text, dubbers, sentence_id)
+                print(f"Created sentence audio: {sentence_file}")
             
             # word_files = self.split_audio_into_words(sentence_file, text, sentence_id)
             # print(f"Created {len(word_files)} word audio files")
             
-            return {
+            result = {
+                'id': sentence_id,
                 'sentence_file': sentence_file,
                 # 'word_files': word_files,
                 'text': sentence_text
             }
+            if self.keep_audio:
+                result['audio'] = self.audio_buffers.pop(sentence_id, None)
+            if self.capture_boundaries:
+                result['boundaries'] = self.word_boundaries.pop(sentence_id, [])
+            if self.manifest is not None:
+                self.manifest.record(sentence_id, sentence_text, voice_key, sentence_file, self.rate,
+                                     boundaries=result.get('boundaries'))
+            if shared is not None:
+                shared.set_result(result)
+            return result
         except Exception as e:
-            print(f"Error processing sentence: {str(e)}")
+            print(f"Error processing sentence {sentence_id}: {str(e)}")
+            self.failures.append({
+                'id': sentence_id,
+                'text': sentence_text,
+                'error': str(e)
+            })
             return None
+        finally:
+            if shared is not None and not shared.done():
+                # Failed or cancelled: let any repeats waiting on this one synthesize for themselves
+                if self._unique.get(dedup_key) is shared:
+                    del self._unique[dedup_key]
+                shared.set_result(None)
+
+    async def _create_sentence_file(self, sentence_text, dubbers, sentence_id):
+        """Synthesize one sentence, with a voice per dialogue part when dubbers match its parts."""
+        # Choose synthesis path based on provided dubbers and text segmentation
+        if isinstance(dubbers, list) and len(dubbers) > 0:
+            if " - " in sentence_text:
+                parts = sentence_text.split(" - ")
+                if len(dubbers) == len(parts):
+                    return await self.create_multivoice_sentence_audio(sentence_text, dubbers, sentence_id)
+                print(f"Dubber/part count mismatch (dubbers={len(dubbers)}, parts={len(parts)}); using first dubber id {dubbers[0]}")
+                voice_name = self._voice_for_id(dubbers[0])
+                return await self.create_sentence_audio(sentence_text, sentence_id, voice_override=voice_name)
+            # No segmentation in text; honor the first dubber id
+            voice_name = self._voice_for_id(dubbers[0])
+            print(f"No parts separator in text; using first dubber id {dubbers[0]} -> {voice_name}")
+            return await self.create_sentence_audio(sentence_text, sentence_id, voice_override=voice_name)
+        return await self.create_sentence_audio(sentence_text, sentence_id)
+
+    async def process_multiple_sentences(self, sentences, concurrency=None):
+        """Process multiple sentences, up to `concurrency` of them at the same time.
 
-    async def process_multiple_sentences(self, sentences):
-        """Process multiple sentences"""
-        results = []
-        for i, sentence in enumerate(sentences, 1):
-            result = await self.process_sentence(sentence, i)
-            if result:
-                results.append(result)
+        Sentence ids always follow input order (MED8000001, MED8000002, ...) and the
+        results come back in that order, whatever order the requests finish in.
+        Failed sentences are collected in self.failures instead of stopping the batch.
+        """
+        self.validate_voices()
+        concurrency = max(1, concurrency or self.concurrency)
+        # Let the adaptive limit grow as far as the requested worker count
+        limiter = self.resilience.limiter
+        limiter.max_limit = max(limiter.max_limit, concurrency)
+        self.failures = []
+        self._unique = {}
+        self.duplicates = 0
+        completed = {}
+        # Workers pull from one shared iterator, so ids are handed out in input order
+        numbered = enumerate(sentences, 1)
+
+        async def worker():
+            for i, sentence in numbered:
+                if sentence is None:
+                    # A blank entry keeps its id, so the following sentences keep theirs
+                    print(f"Skipping empty sentence MED8{i:06d}")
+                    continue
+                result = await self.process_sentence(sentence, i)
+                if result:
+                    completed[i] = result
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        if self.manifest is not None:
+            self.manifest.compact()
+
+        results = [completed[i] for i in sorted(completed)]
+        if self.deduplicate and completed:
+            print(f"Deduplicated {self.duplicates} of {len(completed)} sentences "
+                  f"({self.duplicates / len(completed):.0%} linked to an identical text/voice pair)")
+        if self.failures:
+            self.failures.sort(key=lambda f: f['id'])
+            print(f"\n{len(self.failures)} sentence(s) failed:")
+            for failure in self.failures:
+                print(f"  MED8{failure['id']:06d}: {failure['text']} ({failure['error']})")
+        self.resilience.print_summary()
         return results
 
     def cleanup(self):
@@ -155,12 +387,19 @@ class AudioSplitter:
 async def process_my_sentences():
     output_path = str(Path.home() / "Downloads" / "medicine"/ "audios"/ "georgian")
     # output_path = Path(__file__).parent / "words"
-    splitter = AudioSplitter(output_dir=output_path, voice="ka-GE-EkaNeural")
+    splitter = AudioSplitter(
+        output_dir=output_path,
+        concurrency=8,
+        capture_boundaries=(WORD_SPLIT_MODE == "boundaries"),
+        cache=SynthesisCache(),
+        manifest=RunManifest(Path(output_path) / "manifest.jsonl"),
+        resume=RESUME,
+    )
     
     # Optional: List available voices
     # voices = await splitter.list_voices()
     try:
-        # 1) Try to load sentences from an Excel file in a content/ folder
+        # 1) Try to load sentences from an Excel (or JSONL/CSV) file in a content/ folder
         # Resolve content directory from common locations
         possible_content_dirs = [
             Path(__file__).resolve().parent / "content",
@@ -176,76 +415,22 @@ async def process_my_sentences():
             # Fall back to first candidate even if it doesn't exist; subsequent checks handle existence
             content_dir = possible_content_dirs[0]
 
-        excel_file_name = "sentences.xlsx"
-        excel_path = content_dir / excel_file_name
         print(f"Resolved content directory: {content_dir}")
-        print(f"Excel expected at: {excel_path} (exists={excel_path.exists()})")
-
         sentences = None
 
-        if excel_path.exists():
-            print(f"Loading sentences from Excel: {excel_path}")
-            df = None
-            # Retry loop in case the file is temporarily locked (e.g., by OneDrive/Excel)
-            for attempt in range(5):
-                try:
-                    df = pd.read_excel(excel_path, engine="openpyxl")
-                    break
-                except PermissionError as e:
-                    wait_seconds = 0.5 * (2 ** attempt)
-                    print(f"Permission denied reading Excel (attempt {attempt+1}/5). If the file is open, please close it. Retrying in {wait_seconds:.1f}s...")
-                    time.sleep(wait_seconds)
-                except Exception as e:
-                    # Other read errors should surface to outer handler
-                    raise
-
-            if df is None:
-                # Last resort: attempt to read from a temporary copy
-                try:
-                    tmp_copy = content_dir / f"._read_{excel_file_name}"
-                    print(f"Attempting temp-copy read: {tmp_copy}")
-                    shutil.copy2(excel_path, tmp_copy)
-                    df = pd.read_excel(tmp_copy, engine="openpyxl")
-                    try:
-                        os.remove(tmp_copy)
-                    except Exception:
-                        pass
-                except Exception as e:
-                    print(f"Failed to read Excel file after retries: {e}. Falling back to sentences.json")
-                    df = None
-
+        # Rows are read lazily: synthesis starts on the first sentence while the rest is still being read
+        for file_name in ("sentences.xlsx", "sentences.jsonl", "sentences.csv"):
+            sentence_path = content_dir / file_name
+            if not sentence_path.exists():
+                continue
+            print(f"Loading sentences from: {sentence_path}")
             try:
-                if df is not None:
-                # Normalize columns to lowercase and trimmed
-                    df.columns = [str(c).strip().lower() for c in df.columns]
-                    print(f"Excel columns detected: {df.columns.tolist()}")
-                    if 'sentence' in df.columns:
-                        sentences_from_excel = []
-                        for _, row in df.iterrows():
-                            sentence_text = str(row['sentence']).strip()
-                            if not sentence_text or sentence_text.lower() == 'nan':
-                                continue
-
-                            dubbers_value = row.get('dubbers', None)
-                            d_list = None
-                            if pd.notna(dubbers_value):
-                                # Extract all integers from the cell (supports formats like "1,2", "[1, 2]", "1 2", etc.)
-                                numbers = re.findall(r"\d+", str(dubbers_value))
-                                if numbers:
-                                    d_list = [int(n) for n in numbers]
-
-                            if d_list:
-                                sentences_from_excel.append({'s': sentence_text, 'd': d_list})
-                            else:
-                                sentences_from_excel.append({'s': sentence_text})
-
-                        sentences = sentences_from_excel
-                    else:
-                        print("Excel file does not contain a 'sentence' column; falling back to sentences.json")
+                sentences = open_sentences(sentence_path)
+                break
             except Exception as e:
-                print(f"Failed to read Excel file: {e}. Falling back to sentences.json")
+                print(f"Failed to read {file_name}: {e}")
 
-        # 2) Fallback to JSON if Excel not used
+        # 2) Fallback to JSON if no content/ file was used
         if sentences is None:
             json_candidates = [
                 content_dir / 'sentences.json',
@@ -254,11 +439,10 @@ async def process_my_sentences():
             ]
             json_path = next((p for p in json_candidates if p.exists()), json_candidates[0])
             print(f"Loading sentences from JSON: {json_path} (exists={json_path.exists()})")
-            with open(json_path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-                sentences = data['sentences']
+            sentences = open_sentences(json_path)
             
         results = await splitter.process_multiple_sentences(sentences)
+        splitter.cache.print_stats()
         
         # Print results
         for result in results:
@@ -269,6 +453,11 @@ async def process_my_sentences():
              # Run aToWVosk.py after processing is complete
 
             #  this will autoamtically run the script to split the audio into words
+        if WORD_SPLIT_MODE == "boundaries":
+            from aToWVosk import split_from_synthesis
+            split_from_synthesis(results, Path(output_path) / "words")
+            return
+
         # print("\nRunning aToWVosk.py...")
         try:
             subprocess.run([
@@ -1,20 +1,23 @@
 import os
+import io
 from pathlib import Path
 import shutil
 import asyncio
-import edge_tts
 from pydub import AudioSegment
 from pydub.silence import split_on_silence
 import json
-from mutagen.mp3 import MP3
-from mutagen.id3 import ID3, TIT2
+from mutagen.id3 import ID3, TIT2, ID3NoHeaderError
+from ttsStream import synthesize_to_buffer, write_audio_file
+from synthCache import SynthesisCache
 
 class AudioSplitter:
-    def __init__(self, output_dir="audio_output", voice="en-US-AvaMultilingualNeural"):
+    def __init__(self, output_dir="audio_output", voice="en-US-AvaMultilingualNeural", cache=None):
         self.output_dir = Path(output_dir)
         # Create all directories in the path
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.voice = voice
+        # Optional SynthesisCache for text that was already synthesized on an earlier run
+        self.cache = cache
     
     def clean_filename(self, text):
         """Create a safe filename from text"""
@@ -28,26 +31,47 @@ class AudioSplitter:
         
         print(f"Creating audio file for sentence: {text}")
         
-        communicate = edge_tts.Communicate(text, self.voice)
-        # communicate = edge_tts.Communicate(text, self.voice, rate='-10%')
-        await communicate.save(str(filename))
+        data = await self.synthesize(text)
         
         try:
-            # Create ID3 tag if it doesn't exist
-            audio = MP3(filename)
-            if not audio.tags:
-                audio.add_tags()
-            
-            # Set the title to the sentence text
-            audio.tags.add(TIT2(encoding=3, text=text))
-            audio.save()
-            
+            # Set the title to the sentence text while the audio is still in memory
+            data = self.add_title_tag(data, text)
             print(f"Added title metadata: {text}")
         except Exception as e:
             print(f"Warning: Could not add metadata: {str(e)}")
         
+        write_audio_file(filename, data)
         return filename
 
+    async def synthesize(self, text):
+        """Synthesize text to mp3 bytes, going through the cache when one is set"""
+        rate = '+0%'
+        # rate = '-10%'
+        if self.cache is None:
+            return await synthesize_to_buffer(text, self.voice, rate=rate)
+
+        key = self.cache.make_key(text, self.voice, rate)
+        cached = self.cache.load(key)
+        if cached is not None:
+            print(f"Served from cache: {text}")
+            return cached[0]
+        data = await synthesize_to_buffer(text, self.voice, rate=rate)
+        self.cache.store(key, data)
+        return data
+
+    def add_title_tag(self, data, text):
+        """Return mp3 bytes carrying an ID3 title tag"""
+        buffer = io.BytesIO(data)
+        try:
+            tags = ID3(buffer)
+        except ID3NoHeaderError:
+            # Create ID3 tag if it doesn't exist
+            tags = ID3()
+        tags.add(TIT2(encoding=3, text=text))
+        buffer.seek(0)
+        tags.save(buffer)
+        return buffer.getvalue()
+
     async def process_sentence(self, text, sentence_id=1):
         try:
             print(f"Processing sentence: {text}")
@@ -84,7 +108,7 @@ class AudioSplitter:
 # Example usage
 async def process_my_sentences():
     output_path = Path(r"C:\Users\sikha\Downloads\audios\AvaUSgapsSAMPLES")  # Your specified path
-    splitter = AudioSplitter(output_dir=output_path, voice="en-US-AvaMultilingualNeural")
+    splitter = AudioSplitter(output_dir=output_path, voice="en-US-AvaMultilingualNeural", cache=SynthesisCache())
     
     # Optional: List available voices
     # voices = await splitter.list_voices()
@@ -96,6 +120,7 @@ async def process_my_sentences():
 
     try:
         results = await splitter.process_multiple_sentences(sentences)
+        splitter.cache.print_stats()
         
         # Print results
         for result in results:
@@ -0,0 +1,192 @@
+import math
+from pathlib import Path
+
+# Layer III bitrates (kbps) by bitrate index, for MPEG-1 and for MPEG-2/2.5
+BITRATES_V1 = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]
+BITRATES_V2 = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],   # MPEG-2.5
+}
+
+
+def parse_header(data, offset):
+    """Decode the 4-byte MPEG Layer III frame header at offset, or return None"""
+    if offset + 4 > len(data):
+        return None
+    b0, b1, b2, b3 = data[offset], data[offset + 1], data[offset + 2], data[offset + 3]
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version = (b1 >> 3) & 3
+    layer = (b1 >> 1) & 3
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 3
+    # Only Layer III, and no reserved / free-format values
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = (BITRATES_V1 if mpeg1 else BITRATES_V2)[bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 1
+    mono = (b3 >> 6) == 3
+    samples = 1152 if mpeg1 else 576
+
+    return {
+        'version': version,
+        'sample_rate': sample_rate,
+        'mono': mono,
+        'samples': samples,
+        'length': (samples // 8) * bitrate // sample_rate + padding,
+        'side_info': (17 if mono else 32) if mpeg1 else (9 if mono else 17),
+        'crc': (b1 & 1) == 0,
+    }
+
+
+def _id3v2_size(data):
+    """Length of a leading ID3v2 tag (0 when there is none)"""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+class Mp3Frames:
+    """An mp3 file seen as its list of audio frames.
+
+    Cutting and joining happen on frame boundaries by copying frame bytes, so
+    nothing is decoded or re-encoded. Times are rounded outwards to whole frames
+    (24 ms for Edge TTS's 24 kHz output).
+    """
+
+    def __init__(self, data):
+        self.data = bytes(data)
+        self.frames = []
+        self.header = None
+
+        end = len(self.data)
+        if end >= 128 and self.data[end - 128:end - 125] == b"TAG":
+            end -= 128
+
+        offset = _id3v2_size(self.data)
+        while offset + 4 <= end:
+            header = parse_header(self.data, offset)
+            if header is None or (self.header and not self._same_stream(header)):
+                # Lost sync (junk or a false sync word); scan forward to the next frame
+                offset = self.data.find(b"\xff", offset + 1, end)
+                if offset == -1:
+                    break
+                continue
+            if offset + header['length'] > end:
+                break
+
+            if self.header is None:
+                self.header = header
+                self.header_bytes = self.data[offset:offset + 4]
+                if self._is_info_frame(offset, header):
+                    # Xing/Info/VBRI frame carries stream metadata, not audio
+                    offset += header['length']
+                    continue
+
+            self.frames.append((offset, header['length']))
+            offset += header['length']
+
+        if self.header is None:
+            raise ValueError("No MPEG Layer III frames found")
+
+        self.frame_ms = 1000 * self.header['samples'] / self.header['sample_rate']
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(Path(path).read_bytes())
+
+    def _same_stream(self, header):
+        return (header['version'] == self.header['version']
+                and header['sample_rate'] == self.header['sample_rate']
+                and header['mono'] == self.header['mono'])
+
+    def _is_info_frame(self, offset, header):
+        tag_offset = offset + 4 + (2 if header['crc'] else 0) + header['side_info']
+        tag = self.data[tag_offset:tag_offset + 4]
+        return tag in (b"Xing", b"Info") or self.data[offset + 36:offset + 40] == b"VBRI"
+
+    def compatible(self, other):
+        return self._same_stream(other.header)
+
+    @property
+    def duration_ms(self):
+        return len(self.frames) * self.frame_ms
+
+    def frame_bytes(self, first=0, last=None):
+        """Raw bytes of frames first..last-1"""
+        frames = self.frames[first:last]
+        if not frames:
+            return b""
+        start = frames[0][0]
+        stop = frames[-1][0] + frames[-1][1]
+        # Frames are contiguous unless junk was skipped between them
+        if stop - start == sum(length for _, length in frames):
+            return self.data[start:stop]
+        return b"".join(self.data[o:o + n] for o, n in frames)
+
+    def silence(self, duration_ms):
+        """Pre-encoded silent frames matching this stream, about duration_ms long"""
+        count = round(duration_ms / self.frame_ms)
+        if count <= 0:
+            return b""
+        return silent_frame(self.header_bytes) * count
+
+    def cut(self, start_ms, end_ms, pad_ms=0, lead_in_frames=1):
+        """Copy the frames covering start_ms..end_ms, padded with silence on both sides.
+
+        One extra frame is taken before the start: Layer III frames can borrow
+        bits from the frame before them (the bit reservoir), so the first copied
+        frame may not decode cleanly.
+        """
+        first = max(0, int(start_ms // self.frame_ms) - lead_in_frames)
+        last = min(len(self.frames), math.ceil(end_ms / self.frame_ms))
+        padding = self.silence(pad_ms)
+        return padding + self.frame_bytes(first, last) + padding
+
+
+_silent_frames = {}
+
+
+def silent_frame(header_bytes):
+    """A frame that decodes to silence, using the stream parameters of header_bytes.
+
+    The header is copied without padding or CRC and followed by zeroed side info
+    and main data: zero granule lengths and gains decode to digital silence.
+    """
+    key = bytes(header_bytes)
+    if key not in _silent_frames:
+        header = bytearray(key)
+        header[1] |= 0x01   # no CRC
+        header[2] &= 0xFD   # no padding byte
+        length = parse_header(header, 0)['length']
+        _silent_frames[key] = bytes(header) + bytes(length - 4)
+    return _silent_frames[key]
+
+
+def join_mp3(buffers):
+    """Concatenate mp3 byte strings frame by frame, without re-encoding.
+
+    Returns (joined bytes, start time of each part in ms). Raises ValueError when
+    the parts don't share sample rate, MPEG version and channel mode.
+    """
+    streams = [Mp3Frames(data) for data in buffers]
+    if not streams:
+        raise ValueError("Nothing to join")
+    for stream in streams[1:]:
+        if not streams[0].compatible(stream):
+            raise ValueError("Cannot join mp3 streams with different formats")
+
+    starts = []
+    position = 0.0
+    for stream in streams:
+        starts.append(position)
+        position += stream.duration_ms
+    return b"".join(stream.frame_bytes() for stream in streams), starts
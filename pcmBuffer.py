@@ -0,0 +1,132 @@
+import numpy as np
+from pydub import AudioSegment
+
+SAMPLE_TYPES = {1: np.int8, 2: np.int16, 4: np.int32}
+# AudioSegment.silent()'s default frame rate; padding made at it is resampled to the clip's rate
+SILENT_FRAME_RATE = 11025
+
+
+class PcmBuffer:
+    """Raw PCM samples held as a NumPy array of shape (frames, channels).
+
+    Made from an AudioSegment without copying its bytes, sliced in
+    milliseconds the way AudioSegment slices (as views, no copy), and joined
+    with concat() into a single new array however many parts there are.
+    ClipExporter takes a PcmBuffer wherever it takes an AudioSegment.
+    """
+
+    __slots__ = ("samples", "frame_rate", "sample_width")
+
+    # Zero frames per (frame rate, channels, sample width, ms), shared by every pad()
+    _silence = {}
+
+    def __init__(self, samples, frame_rate, sample_width):
+        self.samples = samples
+        self.frame_rate = frame_rate
+        self.sample_width = sample_width
+
+    @classmethod
+    def from_segment(cls, audio):
+        samples = np.frombuffer(audio.raw_data, dtype=SAMPLE_TYPES[audio.sample_width])
+        return cls(samples.reshape(-1, audio.channels), audio.frame_rate, audio.sample_width)
+
+    @classmethod
+    def concat(cls, parts):
+        """Join buffers of the same format, allocating the result once"""
+        first = parts[0]
+        for part in parts[1:]:
+            if part.format != first.format:
+                raise ValueError(f"Can't join PCM formats {first.format} and {part.format}")
+        return cls(np.concatenate([part.samples for part in parts]), first.frame_rate, first.sample_width)
+
+    @property
+    def channels(self):
+        return self.samples.shape[1]
+
+    @property
+    def format(self):
+        return self.frame_rate, self.channels, self.sample_width
+
+    @property
+    def raw_data(self):
+        """The samples as bytes-like memory (a view unless the array isn't contiguous)"""
+        return np.ascontiguousarray(self.samples).data.cast("B")
+
+    def frame_count(self):
+        return len(self.samples)
+
+    def __len__(self):
+        """Length in milliseconds, as len(AudioSegment)"""
+        return round(1000 * len(self.samples) / self.frame_rate)
+
+    def _frame(self, ms):
+        return int(ms * (self.frame_rate / 1000.0))
+
+    def __getitem__(self, millisecond):
+        """audio[start:end] in milliseconds without copying; frames past the end are silence, as in pydub"""
+        start = min(millisecond.start if millisecond.start is not None else 0, len(self))
+        end = min(millisecond.stop if millisecond.stop is not None else len(self), len(self))
+        start, end = self._frame(start), self._frame(end)
+        view = self.samples[start:end]
+        missing = (end - start) - len(view)
+        if missing > 0:
+            view = np.concatenate([view, np.zeros((missing, self.channels), dtype=self.samples.dtype)])
+        return PcmBuffer(view, self.frame_rate, self.sample_width)
+
+    def silence(self, duration=100):
+        """A shared read-only block of silence in this format, as long as AudioSegment.silent(duration) + self makes it"""
+        key = self.format + (duration,)
+        block = PcmBuffer._silence.get(key)
+        if block is None:
+            # Lengthen as pydub does (resampled from 11025 Hz), so clips keep the same frame counts
+            silent = AudioSegment.silent(duration=duration, frame_rate=SILENT_FRAME_RATE)
+            frames = int(silent.set_frame_rate(self.frame_rate).frame_count())
+            block = np.zeros((frames, self.channels), dtype=self.samples.dtype)
+            block.flags.writeable = False
+            PcmBuffer._silence[key] = block
+        return PcmBuffer(block, self.frame_rate, self.sample_width)
+
+    def pad(self, duration=100):
+        """self with duration ms of silence on each side: silence + self + silence, in one allocation"""
+        silence = self.silence(duration)
+        return PcmBuffer.concat([silence, self, silence])
+
+    def to_segment(self):
+        return AudioSegment(data=bytes(self.raw_data), sample_width=self.sample_width, frame_rate=self.frame_rate,
+                            channels=self.channels)
+
+    def export(self, out_f, format="mp3", **kwargs):
+        return self.to_segment().export(out_f, format=format, **kwargs)
+
+
+def pads_like_pydub(audio):
+    """Whether PcmBuffer.pad() gives the same samples as pydub's silence + audio + silence for this audio.
+
+    pydub converts both sides of + to the larger frame rate and sample width,
+    so audio below 11025 Hz or 16 bits would itself be converted.
+    """
+    return audio.frame_rate >= SILENT_FRAME_RATE and audio.sample_width >= 2 and audio.sample_width in SAMPLE_TYPES
+
+
+def join_segments(segments):
+    """Join AudioSegments end to end in one allocation; returns (PcmBuffer, start of each in ms).
+
+    Segments in different formats are first converted to the largest frame
+    rate, channel count and sample width among them, like AudioSegment + does.
+    """
+    frame_rate = max(seg.frame_rate for seg in segments)
+    channels = max(seg.channels for seg in segments)
+    sample_width = max(seg.sample_width for seg in segments)
+    if sample_width not in SAMPLE_TYPES:
+        sample_width = 4
+
+    parts = []
+    starts = []
+    frames = 0
+    for seg in segments:
+        seg = seg.set_sample_width(sample_width).set_frame_rate(frame_rate).set_channels(channels)
+        starts.append(round(1000 * frames / frame_rate))
+        part = PcmBuffer.from_segment(seg)
+        parts.append(part)
+        frames += part.frame_count()
+    return PcmBuffer.concat(parts), starts
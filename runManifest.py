@@ -0,0 +1,76 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+
+from synthCache import normalize_text
+
+
+def text_hash(text):
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class RunManifest:
+    """Record of the sentences a synthesis run has finished.
+
+    Each completed sentence is appended to a JSONL file as one line and flushed
+    to disk straight away, so a crash loses at most the line being written (a
+    torn last line is ignored on load). Later lines for the same id win.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}
+        if self.path.exists():
+            self._load()
+
+    def _load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self.entries[entry['id']] = entry
+        print(f"Loaded manifest with {len(self.entries)} completed sentences: {self.path}")
+
+    def completed(self, sentence_id, text, voice, rate="+0%"):
+        """The manifest entry if this sentence is done and its output is still valid, else None.
+
+        An entry is stale when the text, voice or rate changed since it was
+        written, or when its output file has gone missing.
+        """
+        entry = self.entries.get(sentence_id)
+        if entry is None:
+            return None
+        if entry['text_hash'] != text_hash(text) or entry['voice'] != voice or entry.get('rate', "+0%") != rate:
+            return None
+        if not Path(entry['path']).exists():
+            return None
+        return entry
+
+    def record(self, sentence_id, text, voice, path, rate="+0%", boundaries=None):
+        entry = {
+            'id': sentence_id,
+            'text_hash': text_hash(text),
+            'voice': voice,
+            'rate': rate,
+            'path': str(path),
+        }
+        if boundaries is not None:
+            entry['boundaries'] = boundaries
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.entries[sentence_id] = entry
+
+    def compact(self):
+        """Rewrite the manifest with one line per sentence (temp file + rename)"""
+        tmp_path = self.path.with_name(f".{self.path.name}.part")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for sentence_id in sorted(self.entries):
+                f.write(json.dumps(self.entries[sentence_id], ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
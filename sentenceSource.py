@@ -0,0 +1,169 @@
+import os
+import re
+import csv
+import json
+import time
+import shutil
+from pathlib import Path
+
+
+def parse_dubbers(value):
+    """Dubber ids from a cell or field: every integer in it ("1,2", "[1, 2]", "1 2", ...), None if there are none"""
+    if value is None or isinstance(value, float) and value != value:
+        return None
+    if isinstance(value, list):
+        value = " ".join(str(v) for v in value)
+    elif isinstance(value, float) and value.is_integer():
+        value = int(value)
+    numbers = re.findall(r"\d+", str(value))
+    return [int(n) for n in numbers] if numbers else None
+
+
+def sentence_record(text, dubbers=None):
+    """A {'s', 'd'} record for process_sentence, or None for an empty row"""
+    if text is None:
+        return None
+    sentence_text = str(text).strip()
+    if not sentence_text or sentence_text.lower() in ('nan', 'none'):
+        return None
+    d_list = parse_dubbers(dubbers)
+    return {'s': sentence_text, 'd': d_list} if d_list else {'s': sentence_text}
+
+
+def _open_workbook(path, attempts=5):
+    """Open a workbook read-only, retrying while it's locked (e.g. by OneDrive/Excel).
+
+    As a last resort the file is copied and the copy opened; returns
+    (workbook, temp copy path or None).
+    """
+    from openpyxl import load_workbook
+    for attempt in range(attempts):
+        try:
+            return load_workbook(path, read_only=True, data_only=True), None
+        except PermissionError:
+            wait_seconds = 0.5 * (2 ** attempt)
+            print(f"Permission denied reading Excel (attempt {attempt+1}/{attempts}). If the file is open, "
+                  f"please close it. Retrying in {wait_seconds:.1f}s...")
+            time.sleep(wait_seconds)
+
+    tmp_copy = path.with_name(f"._read_{path.name}")
+    print(f"Attempting temp-copy read: {tmp_copy}")
+    shutil.copy2(path, tmp_copy)
+    return load_workbook(tmp_copy, read_only=True, data_only=True), tmp_copy
+
+
+def excel_sentences(path):
+    """Sentence records from the first sheet's 'sentence' (and optional 'dubbers') column.
+
+    The workbook is opened and its header checked straight away, so a missing
+    file or column raises here; the rows themselves are read one at a time as
+    the returned iterator is consumed.
+    """
+    path = Path(path)
+    wb, tmp_copy = _open_workbook(path)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        columns = [str(c).strip().lower() for c in next(rows, ())]
+        print(f"Excel columns detected: {columns}")
+        if 'sentence' not in columns:
+            raise ValueError("Excel file does not contain a 'sentence' column")
+    except Exception:
+        wb.close()
+        _remove(tmp_copy)
+        raise
+
+    sentence_col = columns.index('sentence')
+    dubbers_col = columns.index('dubbers') if 'dubbers' in columns else None
+
+    def records():
+        try:
+            for row in rows:
+                if sentence_col >= len(row):
+                    continue
+                dubbers = row[dubbers_col] if dubbers_col is not None and dubbers_col < len(row) else None
+                record = sentence_record(row[sentence_col], dubbers)
+                if record:
+                    yield record
+        finally:
+            wb.close()
+            _remove(tmp_copy)
+
+    return records()
+
+
+def json_sentences(path):
+    """Sentence records from a {"sentences": [...]} file of strings or {'s', 'd'} objects.
+
+    Empty entries come through as None rather than being dropped: sentence ids
+    (and aToWVosk, pairing recordings with sentences.json) go by list position.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return map(_record_from_item, data['sentences'])
+
+
+def jsonl_sentences(path):
+    """Sentence records from a file with one JSON string or {'s', 'd'} object per line, read lazily"""
+    def records():
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = _record_from_item(json.loads(line))
+                    if record:
+                        yield record
+    return records()
+
+
+def csv_sentences(path):
+    """Sentence records from a CSV file with a 'sentence' (and optional 'dubbers') column, read lazily"""
+    f = open(path, 'r', encoding='utf-8-sig', newline='')
+    reader = csv.reader(f)
+    columns = [c.strip().lower() for c in next(reader, [])]
+    if 'sentence' not in columns:
+        f.close()
+        raise ValueError("CSV file does not contain a 'sentence' column")
+    sentence_col = columns.index('sentence')
+    dubbers_col = columns.index('dubbers') if 'dubbers' in columns else None
+
+    def records():
+        with f:
+            for row in reader:
+                if sentence_col >= len(row):
+                    continue
+                dubbers = row[dubbers_col] if dubbers_col is not None and dubbers_col < len(row) else None
+                record = sentence_record(row[sentence_col], dubbers or None)
+                if record:
+                    yield record
+    return records()
+
+
+READERS = {
+    '.xlsx': excel_sentences,
+    '.json': json_sentences,
+    '.jsonl': jsonl_sentences,
+    '.csv': csv_sentences,
+}
+
+
+def open_sentences(path):
+    """Lazy iterator of {'s', 'd'} sentence records from an .xlsx, .json, .jsonl or .csv file (None for a blank JSON entry)"""
+    path = Path(path)
+    reader = READERS.get(path.suffix.lower())
+    if reader is None:
+        raise ValueError(f"Unsupported sentence file: {path} (expected one of {', '.join(READERS)})")
+    return reader(path)
+
+
+def _record_from_item(item):
+    if isinstance(item, dict):
+        return sentence_record(item.get('s'), item.get('d'))
+    return sentence_record(item)
+
+
+def _remove(path):
+    if path is None:
+        return
+    try:
+        os.remove(path)
+    except Exception:
+        pass
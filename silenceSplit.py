@@ -0,0 +1,144 @@
+import itertools
+
+import numpy as np
+
+# NumPy versions of pydub.silence (0.25.1) that find the same ranges in one pass over
+# the samples instead of one AudioSegment slice (and rms call) per seek_step.
+
+SAMPLE_TYPES = {1: np.int8, 2: np.int16, 4: np.int32}
+
+
+def _energy_prefix(audio):
+    """Cumulative sum of squared samples per frame (all channels), with a leading 0.
+
+    Squares are summed as int64, exactly like audioop's double sum as long as a
+    window stays under 2**53 (16-bit audio: about 8M samples); 24/32-bit audio
+    is summed as float64.
+    """
+    data = audio.raw_data
+    if audio.sample_width == 3:
+        # Widen 24-bit samples to 32-bit, keeping their value (top byte sign-extended)
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        samples = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8)
+                   | (raw[:, 2].astype(np.int8).astype(np.int32) << 16))
+    else:
+        samples = np.frombuffer(data, dtype=SAMPLE_TYPES[audio.sample_width])
+
+    dtype = np.int64 if audio.sample_width <= 2 else np.float64
+    squares = samples.astype(dtype) ** 2
+    per_frame = squares.reshape(-1, audio.channels).sum(axis=1)
+    return np.concatenate(([0], np.cumsum(per_frame, dtype=dtype)))
+
+
+def window_rms(audio, starts_ms, length_ms):
+    """audioop.rms of audio[start:start + length_ms] for every start, as pydub would slice it"""
+    prefix = _energy_prefix(audio)
+    frame_count = len(prefix) - 1
+    starts_ms = np.asarray(starts_ms, dtype=np.float64)
+    ends_ms = np.minimum(starts_ms + length_ms, len(audio))
+
+    # AudioSegment.__getitem__: int(ms * frame_rate / 1000), padded with silence past the end
+    start_frames = (starts_ms * (audio.frame_rate / 1000.0)).astype(np.int64)
+    end_frames = (ends_ms * (audio.frame_rate / 1000.0)).astype(np.int64)
+    sums = prefix[np.minimum(end_frames, frame_count)] - prefix[np.minimum(start_frames, frame_count)]
+    samples = (end_frames - start_frames) * audio.channels
+
+    rms = np.zeros(len(starts_ms), dtype=np.float64)
+    nonempty = samples > 0
+    rms[nonempty] = np.floor(np.sqrt(sums[nonempty].astype(np.float64) / samples[nonempty]))
+    return rms
+
+
+def detect_silence(audio_segment, min_silence_len=1000, silence_thresh=-16, seek_step=1):
+    """Silent sections [start, end] in milliseconds, as pydub.silence.detect_silence finds them"""
+    seg_len = len(audio_segment)
+    if seg_len < min_silence_len:
+        return []
+
+    threshold = 10 ** (silence_thresh / 20) * audio_segment.max_possible_amplitude
+
+    last_slice_start = seg_len - min_silence_len
+    slice_starts = np.arange(0, last_slice_start + 1, seek_step)
+    if last_slice_start % seek_step:
+        slice_starts = np.append(slice_starts, last_slice_start)
+
+    silence_starts = slice_starts[window_rms(audio_segment, slice_starts, min_silence_len) <= threshold]
+    if not len(silence_starts):
+        return []
+
+    # A new range starts where the silent windows neither follow on nor overlap
+    steps = np.diff(silence_starts)
+    breaks = np.nonzero((steps != seek_step) & (steps > min_silence_len))[0] + 1
+    range_starts = silence_starts[np.concatenate(([0], breaks))]
+    range_ends = silence_starts[np.concatenate((breaks - 1, [len(silence_starts) - 1]))] + min_silence_len
+    return [[int(start), int(end)] for start, end in zip(range_starts, range_ends)]
+
+
+def detect_nonsilent(audio_segment, min_silence_len=1000, silence_thresh=-16, seek_step=1):
+    """Non-silent sections [start, end] in milliseconds, as pydub.silence.detect_nonsilent finds them"""
+    silent_ranges = detect_silence(audio_segment, min_silence_len, silence_thresh, seek_step)
+    len_seg = len(audio_segment)
+
+    if not silent_ranges:
+        return [[0, len_seg]]
+    if silent_ranges[0][0] == 0 and silent_ranges[0][1] == len_seg:
+        return []
+
+    prev_end_i = 0
+    nonsilent_ranges = []
+    for start_i, end_i in silent_ranges:
+        nonsilent_ranges.append([prev_end_i, start_i])
+        prev_end_i = end_i
+
+    if end_i != len_seg:
+        nonsilent_ranges.append([prev_end_i, len_seg])
+
+    if nonsilent_ranges[0] == [0, 0]:
+        nonsilent_ranges.pop(0)
+
+    return nonsilent_ranges
+
+
+def chunk_ranges(audio_segment, min_silence_len=1000, silence_thresh=-16, keep_silence=100, seek_step=1):
+    """The [start, end] millisecond ranges split_on_silence cuts its chunks from"""
+    if isinstance(keep_silence, bool):
+        keep_silence = len(audio_segment) if keep_silence else 0
+
+    output_ranges = [
+        [start - keep_silence, end + keep_silence]
+        for start, end in detect_nonsilent(audio_segment, min_silence_len, silence_thresh, seek_step)
+    ]
+
+    # Where kept silence would overlap, the two chunks share it
+    first, second = itertools.tee(output_ranges)
+    next(second, None)
+    for range_i, range_ii in zip(first, second):
+        if range_ii[0] < range_i[1]:
+            range_i[1] = (range_i[1] + range_ii[0]) // 2
+            range_ii[0] = range_i[1]
+
+    return [[max(start, 0), min(end, len(audio_segment))] for start, end in output_ranges]
+
+
+def split_on_silence(audio_segment, min_silence_len=1000, silence_thresh=-16, keep_silence=100, seek_step=1):
+    """Drop-in for pydub.silence.split_on_silence: the same chunks, found without a per-step loop"""
+    return [audio_segment[start:end]
+            for start, end in chunk_ranges(audio_segment, min_silence_len, silence_thresh, keep_silence, seek_step)]
+
+
+def energy_word_timestamps(audio_segment, words, min_silence_len=60, silence_thresh=-40, seek_step=5):
+    """Word timings ({'word', 'start', 'end'} in seconds) from the audio's non-silent stretches.
+
+    A cheap stand-in for speech recognition: while there are more stretches
+    than words, the two closest ones are merged; the stretches are then given
+    the words in order. With fewer stretches than words the last words get no
+    timing, which align_words fills in by interpolation. All timings are marked
+    'interpolated', as they are estimates rather than recognized words.
+    """
+    ranges = detect_nonsilent(audio_segment, min_silence_len, silence_thresh, seek_step)
+    while len(ranges) > max(1, len(words)):
+        gaps = [ranges[i + 1][0] - ranges[i][1] for i in range(len(ranges) - 1)]
+        i = gaps.index(min(gaps))
+        ranges[i:i + 2] = [[ranges[i][0], ranges[i + 1][1]]]
+    return [{'word': word, 'start': start / 1000, 'end': end / 1000, 'interpolated': True}
+            for word, (start, end) in zip(words, ranges)]
@@ -0,0 +1,175 @@
+import os
+import json
+import shutil
+import hashlib
+import time
+import unicodedata
+from pathlib import Path
+
+# Edge TTS output format; part of the key so a format change never serves stale audio
+OUTPUT_FORMAT = "audio-24khz-48kbitrate-mono-mp3"
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "textToSpeech"
+
+
+def normalize_text(text):
+    """Unicode-normalize and collapse whitespace, so cosmetic edits still hit the cache"""
+    return " ".join(unicodedata.normalize("NFC", str(text)).split())
+
+
+def link_or_copy(src, dst):
+    """Put src at dst as a hardlink, or a copy when linking isn't possible (other drive, no support)"""
+    dst = Path(dst)
+    tmp_path = dst.with_name(f".{dst.name}.part")
+    if tmp_path.exists():
+        tmp_path.unlink()
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+    return dst
+
+
+class SynthesisCache:
+    """Local content-addressed store of synthesized audio.
+
+    Entries are keyed by a hash of the normalized text, voice, rate and output
+    format, and live as <key>.mp3 (plus <key>.json word boundaries when known)
+    under cache_dir. When the total size passes max_bytes the least recently
+    used entries are removed (down to 90% of the cap, so eviction doesn't run on
+    every store); a hit refreshes an entry's mtime.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=2 * 1024 ** 3):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = None  # key -> [size, last_used], scanned on first use
+        self._total_bytes = 0
+
+    @staticmethod
+    def make_key(text, voice, rate="+0%", output_format=OUTPUT_FORMAT):
+        payload = "\x1f".join([normalize_text(text), voice, rate, output_format])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _audio_path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.mp3"
+
+    def _boundaries_path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _scan(self):
+        if self._entries is not None:
+            return
+        self._entries = {}
+        self._total_bytes = 0
+        for path in self.cache_dir.glob("*/*.mp3"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            self._entries[path.stem] = [stat.st_size, stat.st_mtime]
+            self._total_bytes += stat.st_size
+
+    def _touch(self, key):
+        now = time.time()
+        try:
+            os.utime(self._audio_path(key), (now, now))
+        except OSError:
+            pass
+        self._scan()
+        if key in self._entries:
+            self._entries[key][1] = now
+
+    def has(self, key):
+        """Whether key is cached; doesn't count as a hit or miss"""
+        return self._audio_path(key).exists()
+
+    def boundaries(self, key):
+        """Cached word boundaries for key, or None if none were stored"""
+        path = self._boundaries_path(key)
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def load(self, key, with_boundaries=False):
+        """Return (mp3 bytes, boundaries) for a cached entry, or None on a miss"""
+        path = self._audio_path(key)
+        boundaries = self.boundaries(key) if with_boundaries else []
+        if not path.exists() or boundaries is None:
+            self.misses += 1
+            return None
+        data = path.read_bytes()
+        self.hits += 1
+        self._touch(key)
+        return data, boundaries
+
+    def fetch(self, key, dest):
+        """Hardlink (or copy) a cached entry to dest; False on a miss"""
+        path = self._audio_path(key)
+        if not path.exists():
+            self.misses += 1
+            return False
+        link_or_copy(path, dest)
+        self.hits += 1
+        self._touch(key)
+        return True
+
+    def store(self, key, data, boundaries=None):
+        """Add synthesized audio (and optionally its word boundaries) to the cache"""
+        path = self._audio_path(key)
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.part")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        if boundaries is not None:
+            with open(self._boundaries_path(key), 'w', encoding='utf-8') as f:
+                json.dump(boundaries, f, ensure_ascii=False)
+
+        self._scan()
+        previous = self._entries.get(key)
+        if previous:
+            self._total_bytes -= previous[0]
+        self._entries[key] = [len(data), time.time()]
+        self._total_bytes += len(data)
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries once the cache grows past max_bytes"""
+        self._scan()
+        if self._total_bytes <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        for key, (size, _) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            if self._total_bytes <= target:
+                break
+            for path in (self._audio_path(key), self._boundaries_path(key)):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+            del self._entries[key]
+            self._total_bytes -= size
+            self.evictions += 1
+
+    def stats(self):
+        self._scan()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'bytes': self._total_bytes,
+        }
+
+    def print_stats(self):
+        s = self.stats()
+        print(f"Synthesis cache: {s['hits']} hits, {s['misses']} misses ({s['hit_rate']:.0%} hit rate), "
+              f"{s['entries']} entries, {s['bytes'] / 1024 ** 2:.1f} MB, {s['evictions']} evicted")
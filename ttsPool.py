@@ -0,0 +1,247 @@
+import re
+import ssl
+import json
+import time
+import uuid
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from xml.sax.saxutils import escape
+
+import aiohttp
+import certifi
+from edge_tts.constants import WSS_URL, WSS_HEADERS, SEC_MS_GEC_VERSION
+from edge_tts.drm import DRM
+
+from synthCache import OUTPUT_FORMAT
+
+TICKS_PER_SECOND = 10_000_000
+
+_SSL_CTX = ssl.create_default_context(cafile=certifi.where())
+
+
+def _long_voice_name(voice):
+    """ka-GE-EkaNeural -> Microsoft Server Speech Text to Speech Voice (ka-GE, EkaNeural)"""
+    match = re.match(r"^([a-z]{2,})-([A-Z]{2,})-(.+Neural)$", voice)
+    if not match:
+        return voice
+    lang, region, name = match.groups()
+    if "-" in name:
+        extra, name = name.split("-", 1)
+        region = f"{region}-{extra}"
+    return f"Microsoft Server Speech Text to Speech Voice ({lang}-{region}, {name})"
+
+
+def _timestamp():
+    return time.strftime("%a %b %d %Y %H:%M:%S GMT+0000 (Coordinated Universal Time)", time.gmtime())
+
+
+def _split_message(data):
+    """Split a service message into (headers dict, body) at the blank line"""
+    head, _, body = data.partition(b"\r\n\r\n")
+    headers = {}
+    for line in head.split(b"\r\n"):
+        key, _, value = line.partition(b":")
+        headers[key.strip()] = value.strip()
+    return headers, body
+
+
+class EdgeConnection:
+    """One websocket to the Edge read-aloud service, reused for many requests.
+
+    Requests run one at a time; each is a speech.config (only when the
+    boundary setting changes) plus an ssml message, answered by audio frames,
+    metadata and turn.end on the same socket.
+    """
+
+    def __init__(self, session, endpoint=None, max_age=240):
+        self.session = session
+        self.endpoint = endpoint
+        # Reconnect before the Sec-MS-GEC token in the URL goes stale
+        self.max_age = max_age
+        self.ws = None
+        self.opened_at = 0.0
+        self.word_boundaries = None
+        self.requests = 0
+
+    def _url(self):
+        if self.endpoint:
+            return self.endpoint
+        return (f"{WSS_URL}&Sec-MS-GEC={DRM.generate_sec_ms_gec()}"
+                f"&Sec-MS-GEC-Version={SEC_MS_GEC_VERSION}&ConnectionId={uuid.uuid4().hex}")
+
+    def healthy(self):
+        return (self.ws is not None and not self.ws.closed
+                and time.monotonic() - self.opened_at < self.max_age)
+
+    async def connect(self):
+        await self.close()
+        self.ws = await self.session.ws_connect(
+            self._url(),
+            headers=WSS_HEADERS,
+            compress=15,
+            heartbeat=20,
+            receive_timeout=60,
+            ssl=None if self.endpoint and self.endpoint.startswith("ws://") else _SSL_CTX,
+        )
+        self.opened_at = time.monotonic()
+        self.word_boundaries = None
+
+    async def close(self):
+        if self.ws is not None and not self.ws.closed:
+            await self.ws.close()
+        self.ws = None
+
+    async def _send_config(self, word_boundaries):
+        config = {"context": {"synthesis": {"audio": {
+            "metadataoptions": {
+                "sentenceBoundaryEnabled": "false",
+                "wordBoundaryEnabled": "true" if word_boundaries else "false",
+            },
+            "outputFormat": OUTPUT_FORMAT,
+        }}}}
+        await self.ws.send_str(
+            f"X-Timestamp:{_timestamp()}\r\n"
+            "Content-Type:application/json; charset=utf-8\r\n"
+            "Path:speech.config\r\n\r\n"
+            f"{json.dumps(config, separators=(',', ':'))}\r\n"
+        )
+        self.word_boundaries = word_boundaries
+
+    async def synthesize(self, text, voice, rate="+0%", word_boundaries=False):
+        """Return (mp3 bytes, word boundaries) for text, over this connection"""
+        if not self.healthy():
+            await self.connect()
+        if self.word_boundaries != word_boundaries:
+            await self._send_config(word_boundaries)
+
+        ssml = (
+            "<speak version='1.0' xmlns='http://www.w3.org/2001/10/synthesis' xml:lang='en-US'>"
+            f"<voice name='{_long_voice_name(voice)}'>"
+            f"<prosody pitch='+0Hz' rate='{rate}' volume='+0%'>{escape(text)}</prosody>"
+            "</voice></speak>"
+        )
+        await self.ws.send_str(
+            f"X-RequestId:{uuid.uuid4().hex}\r\n"
+            "Content-Type:application/ssml+xml\r\n"
+            f"X-Timestamp:{_timestamp()}Z\r\n"
+            "Path:ssml\r\n\r\n"
+            f"{ssml}"
+        )
+
+        audio = bytearray()
+        boundaries = []
+        async for message in self.ws:
+            if message.type == aiohttp.WSMsgType.TEXT:
+                headers, body = _split_message(message.data.encode("utf-8"))
+                path = headers.get(b"Path")
+                if path == b"turn.end":
+                    break
+                if path == b"audio.metadata":
+                    for meta in json.loads(body).get("Metadata", []):
+                        if meta.get("Type") != "WordBoundary":
+                            continue
+                        data = meta["Data"]
+                        boundaries.append({
+                            'word': data["text"]["Text"],
+                            'start': data["Offset"] / TICKS_PER_SECOND,
+                            'end': (data["Offset"] + data["Duration"]) / TICKS_PER_SECOND,
+                        })
+            elif message.type == aiohttp.WSMsgType.BINARY:
+                header_length = int.from_bytes(message.data[:2], "big")
+                headers, _ = _split_message(message.data[2:2 + header_length] + b"\r\n\r\n")
+                if headers.get(b"Path") == b"audio":
+                    audio.extend(message.data[2 + header_length:])
+            else:
+                raise ConnectionError(f"Connection closed during synthesis ({message.type.name})")
+        else:
+            raise ConnectionError("Connection closed before turn.end")
+
+        if not audio:
+            raise Exception(f"No audio received for: {text}")
+        self.requests += 1
+        return bytes(audio), boundaries
+
+
+class EdgeConnectionPool:
+    """A fixed number of persistent Edge TTS connections shared by concurrent requests.
+
+    A connection is health-checked before each use (open, not past max_age) and
+    reopened when it isn't; a request that fails on a reused socket is tried
+    once more on a fresh one, since idle sockets are often closed server-side.
+    Requests waiting for a connection get one in the order they asked.
+    """
+
+    def __init__(self, size=4, endpoint=None, max_age=240):
+        self.size = size
+        self.endpoint = endpoint
+        self.max_age = max_age
+        self._session = None
+        self._idle = []
+        self._waiters = deque()
+        self._created = 0
+        self.reconnects = 0
+
+    async def _get_session(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(trust_env=True)
+        return self._session
+
+    @asynccontextmanager
+    async def connection(self):
+        if self._idle:
+            conn = self._idle.pop()
+        elif self._created < self.size:
+            self._created += 1
+            conn = EdgeConnection(await self._get_session(), self.endpoint, self.max_age)
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                conn = await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._release(waiter.result())
+                raise
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def _release(self, conn):
+        # Hand the connection straight to the longest waiting request, so newcomers can't jump the queue
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(conn)
+                return
+        self._idle.append(conn)
+
+    async def synthesize(self, text, voice, rate="+0%", word_boundaries=False):
+        """Return (mp3 bytes, word boundaries) using a pooled connection"""
+        async with self.connection() as conn:
+            reused = conn.healthy()
+            try:
+                return await conn.synthesize(text, voice, rate, word_boundaries)
+            except (aiohttp.ClientError, ConnectionError, asyncio.TimeoutError):
+                await conn.close()
+                if not reused:
+                    raise
+                # The socket looked fine but the service had dropped it; retry on a new one
+                self.reconnects += 1
+                try:
+                    return await conn.synthesize(text, voice, rate, word_boundaries)
+                except Exception:
+                    await conn.close()
+                    raise
+            except Exception:
+                # Don't leave half-read replies on a socket the next request will use
+                await conn.close()
+                raise
+
+    async def close(self):
+        while self._idle:
+            await self._idle.pop().close()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
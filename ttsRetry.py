@@ -0,0 +1,116 @@
+import asyncio
+import random
+import itertools
+
+
+class AdaptiveLimiter:
+    """Concurrency limit that adapts to the service (AIMD).
+
+    Every `limit` successes in a row raise the limit by one (additive increase);
+    a failure halves it (multiplicative decrease), once per congestion event:
+    requests that were already in flight when the limit was last halved fail
+    for the same reason and don't halve it again. Callers wait with
+    `async with limiter:` while the number of requests in flight is at the limit.
+    """
+
+    def __init__(self, max_limit=8, min_limit=1, initial=None):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = self.max_limit if initial is None else max(self.min_limit, min(initial, self.max_limit))
+        self.in_flight = 0
+        # Number of decreases so far; a request notes it when it starts
+        self.epoch = 0
+        self._successes = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        self._successes += 1
+        if self._successes >= self.limit and self.limit < self.max_limit:
+            self.limit += 1
+            self._successes = 0
+
+    def on_failure(self, epoch=None):
+        """Halve the limit, unless the request (started at `epoch`) predates the last decrease"""
+        self._successes = 0
+        if epoch is not None and epoch < self.epoch:
+            return
+        self.limit = max(self.min_limit, self.limit // 2)
+        self.epoch += 1
+
+
+class ResilientCaller:
+    """Retries synthesis calls with jittered exponential backoff under an AdaptiveLimiter.
+
+    Keeps per-call counts of retries and the last error of calls that ran out
+    of attempts, for the end-of-run summary. They are keyed by call, not label,
+    so repeated sentences with the same text are counted separately.
+    """
+
+    # Errors that another attempt can't fix (e.g. an unknown voice name)
+    NOT_RETRIED = (ValueError, TypeError)
+
+    def __init__(self, attempts=5, base_delay=0.5, max_delay=30.0, max_concurrency=8):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.limiter = AdaptiveLimiter(max_limit=max_concurrency)
+        self.retried = {}
+        self.failed = {}
+        self.labels = {}
+        self._call_ids = itertools.count()
+
+    def backoff(self, attempt):
+        """Full-jitter delay before retry number `attempt` (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    async def call(self, label, make_call):
+        """Await make_call() until it succeeds or attempts run out; label names the row in the summary"""
+        call_id = next(self._call_ids)
+        for attempt in range(1, self.attempts + 1):
+            async with self.limiter:
+                epoch = self.limiter.epoch
+                try:
+                    result = await make_call()
+                except self.NOT_RETRIED as e:
+                    self.labels[call_id] = label
+                    self.failed[call_id] = str(e)
+                    raise
+                except Exception as e:
+                    self.limiter.on_failure(epoch)
+                    error = e
+                else:
+                    self.limiter.on_success()
+                    return result
+
+            self.labels[call_id] = label
+            if attempt == self.attempts:
+                self.failed[call_id] = str(error)
+                raise error
+
+            delay = self.backoff(attempt)
+            self.retried[call_id] = self.retried.get(call_id, 0) + 1
+            print(f"Synthesis failed ({error}); retry {attempt}/{self.attempts - 1} in {delay:.1f}s, "
+                  f"concurrency limit now {self.limiter.limit}")
+            await asyncio.sleep(delay)
+
+    def print_summary(self):
+        if not self.retried and not self.failed:
+            return
+        total_retries = sum(self.retried.values())
+        recovered = [call_id for call_id in self.retried if call_id not in self.failed]
+        print(f"\nRetries: {total_retries} over {len(self.retried)} request(s); "
+              f"{len(recovered)} recovered, {len(self.failed)} gave up "
+              f"(final concurrency limit {self.limiter.limit})")
+        for call_id, error in self.failed.items():
+            print(f"  failed after {self.retried.get(call_id, 0)} retries: {self.labels[call_id]} ({error})")
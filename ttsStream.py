@@ -0,0 +1,66 @@
+import os
+from pathlib import Path
+
+
+# Edge TTS reports boundary offsets and durations in 100 ns ticks
+TICKS_PER_SECOND = 10_000_000
+# Longest text sent over a pooled connection; edge_tts splits anything longer itself
+MAX_TEXT_BYTES = 4000
+
+
+async def _stream(text, voice, rate, boundary, pool=None):
+    if pool is not None and len(text.encode("utf-8")) <= MAX_TEXT_BYTES:
+        return await pool.synthesize(text, voice, rate, word_boundaries=(boundary == "WordBoundary"))
+
+    # Only the direct path needs edge_tts; it takes a few hundred ms to import
+    import edge_tts
+    # edge_tts 7.0.0 always asks for word boundaries; callers that don't need them drop them
+    communicate = edge_tts.Communicate(text, voice, rate=rate)
+    audio = bytearray()
+    boundaries = []
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            audio.extend(chunk["data"])
+        elif chunk["type"] == "WordBoundary":
+            boundaries.append({
+                'word': chunk["text"],
+                'start': chunk["offset"] / TICKS_PER_SECOND,
+                'end': (chunk["offset"] + chunk["duration"]) / TICKS_PER_SECOND,
+            })
+
+    if not audio:
+        raise Exception(f"No audio received for: {text}")
+    return bytes(audio), boundaries
+
+
+async def synthesize_to_buffer(text, voice, rate="+0%", pool=None):
+    """Stream synthesized speech into memory and return the mp3 bytes.
+
+    With an EdgeConnectionPool (ttsPool) the request reuses an open connection
+    instead of opening a new one.
+    """
+    audio, _ = await _stream(text, voice, rate, "SentenceBoundary", pool)
+    return audio
+
+
+async def synthesize_with_boundaries(text, voice, rate="+0%", pool=None):
+    """Stream synthesized speech and its word timings.
+
+    Returns the mp3 bytes plus one {'word', 'start', 'end'} dict per WordBoundary
+    event, with times in seconds - the same shape Vosk gives per recognized word.
+    """
+    return await _stream(text, voice, rate, "WordBoundary", pool)
+
+
+def write_audio_file(path, data):
+    """Write audio bytes to disk in one go.
+
+    The bytes land in a temporary name next to the target and are renamed into
+    place, so synced folders never see a half-written mp3.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.part")
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return path
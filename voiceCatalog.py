@@ -0,0 +1,135 @@
+import os
+import json
+import difflib
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+# Voice lists as saved from the Edge TTS service (edge-tts --list-voices); later files add to earlier ones
+SOURCES = [ROOT / "available_voices.json", ROOT / "available_voices-2.json"]
+# Compact index built from SOURCES on first use and rebuilt when they change (not checked in)
+INDEX_PATH = ROOT / ".voice_index.json"
+DUBBERS_PATH = ROOT / "config" / "dubbers.json"
+
+
+def _field(entry, *names):
+    for name in names:
+        if entry.get(name):
+            return entry[name]
+    return None
+
+
+def _signature(sources):
+    """Name, size and modification time of each source, to tell when the index is stale"""
+    signature = []
+    for path in sources:
+        stat = path.stat() if path.exists() else None
+        signature.append([path.name, stat.st_size if stat else 0, stat.st_mtime_ns if stat else 0])
+    return signature
+
+
+def build_index(sources=SOURCES):
+    """[[short name, locale, gender], ...] from voice list files in either naming style, sorted by short name"""
+    voices = {}
+    for path in sources:
+        if not Path(path).exists():
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            for entry in json.load(f):
+                short_name = _field(entry, "ShortName", "short_name")
+                if short_name:
+                    voices[short_name] = [short_name, _field(entry, "Locale", "locale"), _field(entry, "Gender", "gender")]
+    return [voices[name] for name in sorted(voices)]
+
+
+class VoiceCatalog:
+    """The Edge TTS voices listed in available_voices*.json, indexed for lookups.
+
+    The source files are only read when the compact index next to them is
+    missing or older than they are; the dict lookups are built on first use.
+    """
+
+    def __init__(self, sources=SOURCES, index_path=INDEX_PATH):
+        self.sources = [Path(path) for path in sources]
+        self.index_path = Path(index_path)
+        self._by_name = None
+        self._by_locale = None
+
+    def _load(self):
+        if self._by_name is not None:
+            return
+        signature = _signature(self.sources)
+        index = None
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                index = None
+        if index is None or index.get('signature') != signature:
+            index = {'signature': signature, 'voices': build_index(self.sources)}
+            try:
+                tmp_path = self.index_path.with_name(f".{self.index_path.name}.part")
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(index, f, separators=(",", ":"))
+                os.replace(tmp_path, self.index_path)
+            except OSError as e:
+                print(f"Couldn't write voice index {self.index_path}: {e}")
+
+        self._by_name = {}
+        self._by_locale = {}
+        for short_name, locale, gender in index['voices']:
+            voice = {'short_name': short_name, 'locale': locale, 'gender': gender}
+            self._by_name[short_name.lower()] = voice
+            self._by_locale.setdefault(locale.lower(), []).append(voice)
+
+    def get(self, short_name):
+        """The voice with this short name (any case), or None"""
+        self._load()
+        return self._by_name.get(str(short_name).lower())
+
+    def __contains__(self, short_name):
+        return self.get(short_name) is not None
+
+    def voices(self, locale=None, gender=None):
+        """Voices of a locale (e.g. "ka-GE"), optionally only "Female" or "Male" ones"""
+        self._load()
+        found = self._by_locale.get(locale.lower(), []) if locale else list(self._by_name.values())
+        if gender:
+            found = [v for v in found if v['gender'].lower() == gender.lower()]
+        return found
+
+    def suggest(self, short_name):
+        """Closest known short names, for error messages"""
+        self._load()
+        matches = difflib.get_close_matches(str(short_name).lower(), self._by_name, n=3, cutoff=0.6)
+        return [self._by_name[m]['short_name'] for m in matches]
+
+    def validate(self, voices):
+        """Raise ValueError naming every voice that isn't in the catalog (with suggestions)"""
+        unknown = sorted({voice for voice in voices if voice not in self})
+        if not unknown:
+            return
+        problems = []
+        for voice in unknown:
+            suggestions = self.suggest(voice)
+            problems.append(f"{voice!r}" + (f" (did you mean {', '.join(suggestions)}?)" if suggestions else ""))
+        raise ValueError(f"Unknown voice(s): {'; '.join(problems)}. Known voices are listed in "
+                         f"{', '.join(path.name for path in self.sources)}")
+
+
+_catalog = None
+
+
+def catalog():
+    """The shared VoiceCatalog for the files shipped with the project"""
+    global _catalog
+    if _catalog is None:
+        _catalog = VoiceCatalog()
+    return _catalog
+
+
+def load_dubbers(path=DUBBERS_PATH):
+    """(dubber id -> voice short name, default voice) from config/dubbers.json"""
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    return {int(dubber_id): voice for dubber_id, voice in config['dubbers'].items()}, config['default']
@@ -0,0 +1,56 @@
+import re
+import json
+
+# Vosk models are trained on 16 kHz mono audio
+RECOGNIZER_RATE = 16000
+# Audio handed to the recognizer per AcceptWaveform call (4 s of 16-bit samples)
+CHUNK_BYTES = RECOGNIZER_RATE * 2 * 4
+
+
+def recognizer_pcm(audio):
+    """16 kHz mono 16-bit PCM bytes for the recognizer from an already decoded AudioSegment.
+
+    Resampling happens in memory, so the file is decoded once (by the ffmpeg pipe
+    pydub reads from) and no WAV file is written.
+    """
+    return audio.set_frame_rate(RECOGNIZER_RATE).set_channels(1).set_sample_width(2).raw_data
+
+
+def sentence_grammar(text):
+    """Recognizer grammar allowing only the words of text (each once), plus [unk] for anything else"""
+    words = []
+    for word in re.findall(r"\w+(?:'\w+)*", text.lower()):
+        if word not in words:
+            words.append(word)
+    return words + ["[unk]"]
+
+
+def recognize_pcm(model, pcm, sample_rate=RECOGNIZER_RATE, chunk_bytes=CHUNK_BYTES, grammar=None):
+    """Word timestamps ({'word', 'start', 'end', 'conf'} dicts) for PCM bytes.
+
+    grammar is a list of words/phrases (see sentence_grammar) the recognizer is
+    limited to. Only models with a dynamic graph (the "small" models) support
+    it; the others log a warning and use their full vocabulary.
+    """
+    from vosk import KaldiRecognizer
+    if grammar:
+        rec = KaldiRecognizer(model, sample_rate, json.dumps(grammar, ensure_ascii=False))
+    else:
+        rec = KaldiRecognizer(model, sample_rate)
+    rec.SetWords(True)
+
+    words_with_times = []
+    view = memoryview(pcm)
+    for start in range(0, len(view), chunk_bytes):
+        # A result is only ready (and parsed) when Vosk detects the end of an utterance
+        if rec.AcceptWaveform(bytes(view[start:start + chunk_bytes])):
+            result = json.loads(rec.Result())
+            if 'result' in result:
+                words_with_times.extend(result['result'])
+
+    # Get final result
+    result = json.loads(rec.FinalResult())
+    if 'result' in result:
+        words_with_times.extend(result['result'])
+
+    return words_with_times
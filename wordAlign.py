@@ -0,0 +1,108 @@
+def normalize_word(word):
+    """Lowercase a word and drop punctuation, so "OK?" and "ok" compare equal"""
+    return "".join(ch for ch in word.lower() if ch.isalnum())
+
+
+def _edit_script(source, target):
+    """Levenshtein alignment of two token lists as (op, source index, target index) steps.
+
+    op is "match", "sub", "del" (source token not heard) or "ins" (extra target
+    token); the unused index is None.
+    """
+    rows, cols = len(source) + 1, len(target) + 1
+    cost = [[0] * cols for _ in range(rows)]
+    for i in range(1, rows):
+        cost[i][0] = i
+    for j in range(1, cols):
+        cost[0][j] = j
+    for i in range(1, rows):
+        for j in range(1, cols):
+            diagonal = cost[i - 1][j - 1] + (source[i - 1] != target[j - 1])
+            cost[i][j] = min(diagonal, cost[i - 1][j] + 1, cost[i][j - 1] + 1)
+
+    steps = []
+    i, j = len(source), len(target)
+    while i or j:
+        if i and j and cost[i][j] == cost[i - 1][j - 1] + (source[i - 1] != target[j - 1]):
+            steps.append(("match" if source[i - 1] == target[j - 1] else "sub", i - 1, j - 1))
+            i, j = i - 1, j - 1
+        elif i and cost[i][j] == cost[i - 1][j] + 1:
+            steps.append(("del", i - 1, None))
+            i -= 1
+        else:
+            steps.append(("ins", None, j - 1))
+            j -= 1
+    steps.reverse()
+    return steps
+
+
+def _interpolate(matched, original_words, spoken, duration):
+    """Fill timings for runs of unheard words from the gap between their timed neighbours.
+
+    A gap is shared out in proportion to word length; the end of the audio
+    (duration, or the last timing when unknown) closes a trailing run.
+    """
+    k = 0
+    while k < len(spoken):
+        if matched[spoken[k]] is not None:
+            k += 1
+            continue
+        run_end = k
+        while run_end < len(spoken) and matched[spoken[run_end]] is None:
+            run_end += 1
+
+        start = matched[spoken[k - 1]]['end'] if k else 0.0
+        if run_end < len(spoken):
+            end = matched[spoken[run_end]]['start']
+        else:
+            end = duration if duration is not None else start
+        end = max(start, end)
+
+        run = spoken[k:run_end]
+        lengths = [len(normalize_word(original_words[index])) for index in run]
+        total = sum(lengths)
+        position = start
+        for index, length in zip(run, lengths):
+            share = (end - start) * length / total
+            matched[index] = {'word': original_words[index], 'start': position, 'end': position + share,
+                              'interpolated': True}
+            position += share
+        k = run_end
+
+
+def align_words(original_words, words_with_times, duration=None):
+    """Pair each original word with a recognized timing by edit-distance alignment.
+
+    Returns (matched, extras, substitutions):
+      matched       - one timing dict per original word; None for punctuation-only
+                      tokens such as the dialogue "-". Words the recognizer
+                      dropped get a timing interpolated from their neighbours,
+                      marked 'interpolated': True.
+      extras        - recognized words with no original word (insertions).
+      substitutions - {'index', 'original', 'detected'} for words heard as a
+                      different word; these still get the heard word's timing.
+    """
+    spoken = [i for i, word in enumerate(original_words) if normalize_word(word)]
+    source = [normalize_word(original_words[i]) for i in spoken]
+    target = [normalize_word(w['word']) for w in words_with_times]
+
+    matched = [None] * len(original_words)
+    extras = []
+    substitutions = []
+    for op, s, t in _edit_script(source, target):
+        if op == "ins":
+            extras.append(words_with_times[t])
+            continue
+        if op == "del":
+            continue
+        index = spoken[s]
+        timing = words_with_times[t]
+        matched[index] = {'word': timing['word'], 'start': timing['start'], 'end': timing['end']}
+        if timing.get('interpolated'):
+            # Estimated rather than recognized (silenceSplit.energy_word_timestamps)
+            matched[index]['interpolated'] = True
+        if op == "sub":
+            substitutions.append({'index': index, 'original': original_words[index], 'detected': timing['word']})
+
+    _interpolate(matched, original_words, spoken, duration)
+    return matched, extras, substitutions
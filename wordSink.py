@@ -0,0 +1,185 @@
+import os
+import csv
+import json
+import textwrap
+from pathlib import Path
+
+# word_data record fields, in the order they appear as Excel columns
+WORD_FIELDS = ['word', 'fileName', 'ordinalNumber', 'wordIndex', 'originalWord', 'detected', 'isExtra']
+HYPHENS = ['-', '–', '—']
+
+
+def renumber_words(entries):
+    """Yield word records as they go into the Excel file, without touching the originals.
+
+    Dialogue hyphens are dropped and the rest get consecutive ENGB1X numbers
+    (keeping their -0200 style suffix); a sentence containing a hyphen leaves a
+    one-number gap before the next sentence.
+    """
+    current_sequence = 1
+    current_ordinal = None
+    has_hyphen = False
+
+    for entry in entries:
+        # Check if we're starting a new sentence
+        if current_ordinal != entry['ordinalNumber']:
+            if has_hyphen:
+                # If previous sentence had a hyphen, increment sequence to maintain gap
+                current_sequence += 1
+            current_ordinal = entry['ordinalNumber']
+            has_hyphen = False
+
+        if entry['word'] in HYPHENS:
+            has_hyphen = True
+            continue
+
+        suffix = entry['fileName'].split('-')[1]  # Get the '0200' part
+        yield {**entry, 'fileName': f"ENGB1X{current_sequence:06d}-{suffix}"}
+        current_sequence += 1
+
+
+def write_word_excel(entries, output_file):
+    """Write renumbered word records to an .xlsx file row by row (openpyxl write-only mode)"""
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(WORD_FIELDS)
+    count = 0
+    for entry in renumber_words(entries):
+        ws.append([entry.get(field) for field in WORD_FIELDS])
+        count += 1
+    wb.save(output_file)
+    return count
+
+
+class WordSink:
+    """Append-only files for the word_data records and mismatches of a long run.
+
+    Each split file's records are appended and flushed as soon as they exist,
+    so memory stays flat however many files are processed, and the files on
+    disk are always the run's progress so far. Words go to word_data.jsonl (or
+    word_data.csv with fmt="csv"), mismatches to text_mismatches.jsonl. The
+    Excel / JSON / parquet outputs are built from them once, at the end.
+
+    offsets() describes how far the files have got; passing that back as
+    resume_from reopens them cut back to exactly that point, dropping anything
+    written after it (e.g. by a run that crashed before its next checkpoint).
+    """
+
+    def __init__(self, folder, fmt="jsonl", resume_from=None):
+        if fmt not in ("jsonl", "csv"):
+            raise ValueError(f"Unknown word sink format: {fmt}")
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.fmt = fmt
+        self.words_path = self.folder / f"word_data.{fmt}"
+        self.mismatches_path = self.folder / "text_mismatches.jsonl"
+        self.word_count = 0
+        self.mismatch_count = 0
+
+        if resume_from is not None:
+            os.truncate(self.words_path, resume_from['words_bytes'])
+            os.truncate(self.mismatches_path, resume_from['mismatches_bytes'])
+            self.word_count = resume_from['word_count']
+            self.mismatch_count = resume_from['mismatch_count']
+        mode = 'a' if resume_from is not None else 'w'
+        self._words = open(self.words_path, mode, encoding='utf-8', newline='')
+        self._mismatches = open(self.mismatches_path, mode, encoding='utf-8')
+        if fmt == "csv":
+            self._csv = csv.DictWriter(self._words, fieldnames=WORD_FIELDS)
+            if resume_from is None:
+                self._csv.writeheader()
+
+    def write_words(self, entries):
+        for entry in entries:
+            if self.fmt == "csv":
+                self._csv.writerow({field: entry.get(field) for field in WORD_FIELDS})
+            else:
+                self._words.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.word_count += 1
+        self._words.flush()
+
+    def write_mismatch(self, mismatch):
+        self._mismatches.write(json.dumps(mismatch, ensure_ascii=False) + "\n")
+        self._mismatches.flush()
+        self.mismatch_count += 1
+
+    def offsets(self):
+        """Sizes and record counts of the sink files, synced to disk, for a checkpoint"""
+        for f in (self._words, self._mismatches):
+            f.flush()
+            os.fsync(f.fileno())
+        return {
+            'words_bytes': os.path.getsize(self.words_path),
+            'mismatches_bytes': os.path.getsize(self.mismatches_path),
+            'word_count': self.word_count,
+            'mismatch_count': self.mismatch_count,
+        }
+
+    def close(self):
+        self._words.close()
+        self._mismatches.close()
+
+    def iter_words(self):
+        """Read the word records back one at a time"""
+        self._words.flush()
+        with open(self.words_path, 'r', encoding='utf-8', newline='') as f:
+            if self.fmt == "csv":
+                for row in csv.DictReader(f):
+                    yield {
+                        **row,
+                        'ordinalNumber': int(row['ordinalNumber']),
+                        'wordIndex': int(row['wordIndex']),
+                        'detected': row['detected'] == "True",
+                        'isExtra': row['isExtra'] == "True",
+                    }
+            else:
+                for line in f:
+                    yield json.loads(line)
+
+    def iter_mismatches(self):
+        self._mismatches.flush()
+        with open(self.mismatches_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+    def export_excel(self, output_file):
+        """Build the word_data Excel file in one streaming pass; returns the number of rows"""
+        return write_word_excel(self.iter_words(), output_file)
+
+    def export_mismatches(self, output_file):
+        """Write text_mismatches.json in the {"mismatches": [...]} shape, one entry at a time"""
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write('{\n  "mismatches": [')
+            for i, mismatch in enumerate(self.iter_mismatches()):
+                entry = textwrap.indent(json.dumps(mismatch, indent=2, ensure_ascii=False), "    ")
+                f.write(("," if i else "") + "\n" + entry)
+            f.write("\n  ]\n}\n")
+
+    def export_parquet(self, output_file, batch_size=50_000):
+        """Write the renumbered word records as a parquet file (needs pyarrow)"""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export needs pyarrow: pip install pyarrow")
+
+        writer = None
+        batch = []
+
+        def write_batch():
+            nonlocal writer
+            table = pa.Table.from_pylist(batch)
+            if writer is None:
+                writer = pq.ParquetWriter(str(output_file), table.schema)
+            writer.write_table(table)
+            batch.clear()
+
+        for entry in renumber_words(self.iter_words()):
+            batch.append({field: entry.get(field) for field in WORD_FIELDS})
+            if len(batch) >= batch_size:
+                write_batch()
+        if batch:
+            write_batch()
+        if writer is not None:
+            writer.close()
@@ -1,16 +1,24 @@
+import os
+import time
 import asyncio
 import re
 from pathlib import Path
 
-from openpyxl import load_workbook
-
-# Reuse your TTS logic and 101/102 voice mapping
+# Reuse your TTS logic; dubber ids map to voices through config/dubbers.json
 from main import AudioSplitter
+from voiceCatalog import catalog, load_dubbers
+from synthCache import SynthesisCache, normalize_text, link_or_copy
 
 
 EXCEL_PATH = Path("/Users/ilia/Desktop/textToSpeech/content/MED6.xlsx")
 TARGET_SHEET_NAME = "words"  # case-insensitive match
 OUTPUT_DIR = Path("/Users/ilia/Downloads/medicine/audios/georgian/words")
+# Words synthesized at the same time; 1 keeps the one-word-at-a-time loop
+CONCURRENCY = 8
+# The workbook is saved after this many new file names, or when this many seconds have passed
+SAVE_EVERY_ROWS = 200
+SAVE_EVERY_SECONDS = 60
+FILE_NAME_PATTERN = re.compile(r"MED6X(\d+)")
 
 
 def _norm(s):
@@ -48,23 +56,19 @@ def _find_or_create_audio_col(ws, header_row=1):
     return words_col, dubbers_col, audio_col
 
 
-async def synthesize_all():
-    if not EXCEL_PATH.exists():
-        raise FileNotFoundError(f"Excel not found at: {EXCEL_PATH}")
-
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-
-    wb = load_workbook(EXCEL_PATH)
-    ws = _find_sheet_by_name_case_insensitive(wb, TARGET_SHEET_NAME)
-
-    header_row = 1
-    words_col, dubbers_col, audio_col = _find_or_create_audio_col(ws, header_row=header_row)
-    if not words_col:
-        raise RuntimeError("Couldn't find 'words' column (case-insensitive).")
+def _voice_for_dubber(dubber_val, dubbers, default_voice):
+    """Voice for the first dubber id in a cell (config/dubbers.json); the default voice otherwise"""
+    if dubber_val is not None:
+        nums = re.findall(r"\d+", str(dubber_val))
+        if nums:
+            return dubbers.get(int(nums[0]), default_voice)
+    return default_voice
 
-    splitter = AudioSplitter(output_dir=str(OUTPUT_DIR))
 
-    counter = 1
+def _pending_rows(ws, header_row, words_col, dubbers_col, audio_col):
+    """(row, word, voice) for every word row that has no audio file name yet"""
+    dubbers, default_voice = load_dubbers()
+    rows = []
     for r in range(header_row + 1, ws.max_row + 1):
         word_val = ws.cell(row=r, column=words_col).value
         if word_val is None or str(word_val).strip() == "":
@@ -75,28 +79,106 @@ async def synthesize_all():
         if cur_audio and str(cur_audio).strip():
             continue
 
-        dubber_val = None
-        if dubbers_col:
-            dubber_val = ws.cell(row=r, column=dubbers_col).value
-
-        dubber_id = None
-        if dubber_val is not None:
-            nums = re.findall(r"\d+", str(dubber_val))
-            if nums:
-                dubber_id = int(nums[0])
-
-        # Always pass a valid Edge TTS voice; avoid falling back to invalid default
-        if dubber_id == 101:
-            voice_override = "ka-GE-GiorgiNeural"
-        elif dubber_id == 102:
-            voice_override = "ka-GE-EkaNeural"
-        else:
-            voice_override = "ka-GE-EkaNeural"
+        dubber_val = ws.cell(row=r, column=dubbers_col).value if dubbers_col else None
+        rows.append((r, str(word_val).strip(), _voice_for_dubber(dubber_val, dubbers, default_voice)))
+    return rows
+
+
+def _first_free_counter(ws, header_row, audio_col, output_dir):
+    """One past the highest MED6X number in the sheet or the output folder"""
+    highest = 0
+    names = [ws.cell(row=r, column=audio_col).value for r in range(header_row + 1, ws.max_row + 1)]
+    names += [path.stem for path in output_dir.glob("MED6X*.mp3")]
+    for name in names:
+        match = FILE_NAME_PATTERN.fullmatch(str(name).strip()) if name else None
+        if match:
+            highest = max(highest, int(match.group(1)))
+    return highest + 1
+
+
+class WorkbookSaver:
+    """Saves the workbook every `rows` new file names or `seconds` seconds, whichever comes first.
+
+    Each save writes a temp file next to the workbook and renames it over the
+    original, so a crash mid-save never leaves a truncated workbook. A save that
+    fails (e.g. the file is open in Excel) is retried at the next checkpoint;
+    the last one, save_final, retries with backoff instead.
+    """
+
+    def __init__(self, wb, path, rows=SAVE_EVERY_ROWS, seconds=SAVE_EVERY_SECONDS):
+        self.wb = wb
+        self.path = Path(path)
+        self.rows = rows
+        self.seconds = seconds
+        self.unsaved = 0
+        self.last_save = time.monotonic()
+
+    def row_done(self):
+        self.unsaved += 1
+        if self.unsaved >= self.rows or time.monotonic() - self.last_save >= self.seconds:
+            self.save()
+
+    def save(self):
+        tmp_path = self.path.with_name(f".{self.path.stem}.part{self.path.suffix}")
+        try:
+            self.wb.save(tmp_path)
+            os.replace(tmp_path, self.path)
+        except PermissionError as e:
+            try:
+                tmp_path.unlink(missing_ok=True)
+            except OSError:
+                pass
+            print(f"Couldn't save workbook ({e}); is it open in Excel? Retrying at the next checkpoint")
+            return False
+        print(f"Saved workbook ({self.unsaved} new file names)")
+        self.unsaved = 0
+        self.last_save = time.monotonic()
+        return True
+
+    async def save_final(self, attempts=5):
+        """Save once more at the end, retrying while the workbook is locked; False if it never worked"""
+        for attempt in range(attempts):
+            if self.save():
+                return True
+            if attempt + 1 < attempts:
+                wait_seconds = 0.5 * (2 ** attempt)
+                print(f"Final save failed (attempt {attempt+1}/{attempts}). If the workbook is open, "
+                      f"please close it. Retrying in {wait_seconds:.1f}s...")
+                await asyncio.sleep(wait_seconds)
+        print(f"Gave up saving {self.path}: {self.unsaved} file name(s) since the last save are not in it")
+        return False
+
+
+def _plan(rows, first_counter):
+    """Number the rows in order and group them by normalized word and voice.
+
+    Returns the groups in order of first appearance; each is a list of
+    (row, word, voice, counter) whose audio is synthesized once, for the first
+    row, and linked (or copied) to the others' files.
+    """
+    groups = {}
+    for k, (r, word, voice) in enumerate(rows):
+        groups.setdefault((normalize_text(word), voice), []).append((r, word, voice, first_counter + k))
+    return list(groups.values())
+
 
+def _fill_duplicates(ws, audio_col, output_dir, saver, group, source_path):
+    """Give every other row of a group its own file, linked to the audio made for the first"""
+    for r, _, _, counter in group[1:]:
+        base_name = f"MED6X{counter:06d}"
+        link_or_copy(source_path, output_dir / f"{base_name}.mp3")
+        ws.cell(row=r, column=audio_col, value=base_name)
+        saver.row_done()
+
+
+async def _synthesize_in_order(splitter, ws, groups, audio_col, output_dir, saver):
+    """The original loop: one word at a time, MED8 temp name renamed to MED6X"""
+    for group in groups:
+        r, word, voice_override, counter = group[0]
         # Generate with underlying TTS, then rename to MED6X###### and store name without extension
-        out_path = await splitter.create_sentence_audio(str(word_val).strip(), sentence_id=counter, voice_override=voice_override)
+        out_path = await splitter.create_sentence_audio(word, sentence_id=counter, voice_override=voice_override)
         base_name = f"MED6X{counter:06d}"
-        new_path = OUTPUT_DIR / f"{base_name}.mp3"
+        new_path = output_dir / f"{base_name}.mp3"
 
         try:
             if new_path.exists():
@@ -109,10 +191,111 @@ async def synthesize_all():
 
         # Write without extension into Excel
         ws.cell(row=r, column=audio_col, value=base_name)
+        saver.row_done()
+        _fill_duplicates(ws, audio_col, output_dir, saver, group, new_path)
+
+
+async def _synthesize_concurrently(splitter, ws, groups, audio_col, output_dir, saver, concurrency):
+    """Synthesize up to `concurrency` words at once, each straight into its final MED6X file.
+
+    Counters are handed out in row order before anything is sent (see _plan),
+    so the names don't depend on which request finishes first. A word that
+    fails (synthesis, linking its repeats or a workbook save) is reported and
+    the worker moves on; rows left with empty cells (and their numbers unused)
+    are picked up by the next run.
+    """
+    jobs = iter(groups)
+    failures = []
+
+    async def worker():
+        for group in jobs:
+            r, word, voice_override, counter = group[0]
+            base_name = f"MED6X{counter:06d}"
+            out_path = output_dir / f"{base_name}.mp3"
+            print(f"Creating audio file for word: {word}")
+            try:
+                await splitter.create_audio_file(word, out_path, counter, voice_override)
+                ws.cell(row=r, column=audio_col, value=base_name)
+                saver.row_done()
+                _fill_duplicates(ws, audio_col, output_dir, saver, group, out_path)
+            except Exception as e:
+                failures.append((r, word, str(e)))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    if failures:
+        print(f"\n{len(failures)} word(s) failed:")
+        for r, word, error in sorted(failures):
+            print(f"  row {r}: {word} ({error})")
+
+
+async def synthesize_all(excel_path=EXCEL_PATH, output_dir=OUTPUT_DIR, pool=None, cache=True, concurrency=CONCURRENCY,
+                         save_every_rows=SAVE_EVERY_ROWS, save_every_seconds=SAVE_EVERY_SECONDS):
+    """Synthesize every word row without an audio file name and write the names back.
+
+    New files are numbered on from the highest MED6X name already used, so a
+    resumed run never overwrites files that saved rows point to. With
+    concurrency > 1 they are written under their final names and requested
+    concurrently.
+    Either way a word repeated with the same voice is synthesized once and
+    linked (or copied) to each of its rows' files.
+    The workbook is saved every save_every_rows rows or save_every_seconds
+    seconds, and once more at the end (also after an error).
 
-        counter += 1
+    A pool passed in (e.g. one pointed at fakeTtsServer by loadTest.py) is left
+    open for the caller; cache=False skips the synthesis cache.
+    """
+    excel_path = Path(excel_path)
+    output_dir = Path(output_dir)
+    if not excel_path.exists():
+        raise FileNotFoundError(f"Excel not found at: {excel_path}")
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # openpyxl (and below, the pool's aiohttp) load only when a run starts, not on import
+    from openpyxl import load_workbook
+    wb = load_workbook(excel_path)
+    ws = _find_sheet_by_name_case_insensitive(wb, TARGET_SHEET_NAME)
+
+    header_row = 1
+    words_col, dubbers_col, audio_col = _find_or_create_audio_col(ws, header_row=header_row)
+    if not words_col:
+        raise RuntimeError("Couldn't find 'words' column (case-insensitive).")
+
+    rows = _pending_rows(ws, header_row, words_col, dubbers_col, audio_col)
+    # A misspelt voice would otherwise fail once per row
+    catalog().validate({voice for _, _, voice in rows})
+    concurrency = max(1, concurrency)
+    first_counter = _first_free_counter(ws, header_row, audio_col, output_dir)
+    groups = _plan(rows, first_counter)
+    if rows:
+        print(f"{len(rows)} word(s) to synthesize, {len(groups)} unique word/voice pairs "
+              f"({1 - len(groups) / len(rows):.0%} deduplicated)")
+
+    # Word lists are many tiny requests: keep connections open instead of a handshake per word
+    own_pool = pool is None
+    if own_pool:
+        from ttsPool import EdgeConnectionPool
+        pool = EdgeConnectionPool(size=max(4, concurrency))
+    splitter = AudioSplitter(output_dir=str(output_dir), cache=SynthesisCache() if cache else None, pool=pool,
+                             concurrency=concurrency)
+    saver = WorkbookSaver(wb, excel_path, rows=save_every_rows, seconds=save_every_seconds)
+
+    try:
+        if concurrency == 1:
+            await _synthesize_in_order(splitter, ws, groups, audio_col, output_dir, saver)
+        else:
+            await _synthesize_concurrently(splitter, ws, groups, audio_col, output_dir, saver, concurrency)
+    finally:
+        saved = await saver.save_final()
+        if own_pool:
+            await pool.close()
+    if not saved:
+        raise PermissionError(f"Couldn't save {excel_path}; the names of the last {saver.unsaved} file(s) "
+                              f"written to {output_dir} are missing from it")
 
-    wb.save(EXCEL_PATH)
+    splitter.resilience.print_summary()
+    if splitter.cache is not None:
+        splitter.cache.print_stats()
     print("Done. Wrote filenames to 'audioFileName' and saved workbook.")
 
 